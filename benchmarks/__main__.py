@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# Copyright (C) 2017-present Robert Griesel
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>
+
+
+''' Headless benchmarks for the document engine. Run from the source
+    folder:
+
+        python3 -m benchmarks [--size 100000] [--repeat 5] [--only typing,layout]
+                              [--output results.json] [--baseline results.json] [--threshold 0.25]
+
+    Results go to stdout (or the output file) as JSON, times in
+    milliseconds. With a baseline, medians more than threshold above
+    the baseline are reported as regressions and the exit status is 1. '''
+
+import sys, json, platform, argparse
+
+import benchmarks.environment as environment
+environment.init()
+
+import benchmarks.cases as cases
+from lemma.infrastructure.profiler import Profiler
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser(prog='python3 -m benchmarks', description='Headless benchmarks for the document engine.')
+    parser.add_argument('--size', type=int, default=100000, help='characters per note')
+    parser.add_argument('--repeat', type=int, default=5, help='how often each measurement is repeated')
+    parser.add_argument('--only', default=None, help='comma separated benchmarks to run: ' + ', '.join(benchmark.__name__ for benchmark in cases.benchmarks))
+    parser.add_argument('--output', default=None, help='write results to this file instead of stdout')
+    parser.add_argument('--baseline', default=None, help='results of an earlier run to compare with')
+    parser.add_argument('--threshold', type=float, default=0.25, help='tolerated slowdown of medians against the baseline, 0.25 = 25 percent')
+    return parser.parse_args()
+
+
+def get_statistics(samples, threshold):
+    ordered_samples = sorted(samples)
+
+    statistics = dict()
+    statistics['samples'] = len(samples)
+    statistics['min'] = ordered_samples[0] * 1000
+    statistics['median'] = Profiler.get_percentile(ordered_samples, 50) * 1000
+    statistics['p90'] = Profiler.get_percentile(ordered_samples, 90) * 1000
+    statistics['max'] = ordered_samples[-1] * 1000
+    statistics['threshold'] = threshold
+    return statistics
+
+
+def get_regressions(results, baseline):
+    regressions = []
+    for name, statistics in sorted(results.items()):
+        if name not in baseline['results']: continue
+
+        median_before = baseline['results'][name]['median']
+        median_after = statistics['median']
+        if median_after > median_before * (1 + statistics['threshold']):
+            regressions.append({'name': name, 'baseline': median_before, 'median': median_after, 'ratio': median_after / median_before})
+    return regressions
+
+
+arguments = get_arguments()
+names = arguments.only.split(',') if arguments.only != None else [benchmark.__name__ for benchmark in cases.benchmarks]
+
+results = dict()
+for benchmark in cases.benchmarks:
+    if benchmark.__name__ not in names: continue
+
+    print('running ' + benchmark.__name__ + ' ...', file=sys.stderr)
+    for name, samples in benchmark(arguments.size, arguments.repeat).items():
+        results[name] = get_statistics(samples, arguments.threshold)
+        print('    {:<40} median {:10.3f} ms    p90 {:10.3f} ms'.format(name, results[name]['median'], results[name]['p90']), file=sys.stderr)
+
+report = dict()
+report['size'] = arguments.size
+report['repeat'] = arguments.repeat
+report['python'] = platform.python_version()
+report['machine'] = platform.machine()
+report['results'] = results
+
+if arguments.baseline != None:
+    with open(arguments.baseline, 'r') as file:
+        baseline = json.load(file)
+    report['regressions'] = get_regressions(results, baseline)
+
+    for regression in report['regressions']:
+        print('regression: {name} {baseline:.3f} ms -> {median:.3f} ms ({ratio:.2f}x)'.format(**regression), file=sys.stderr)
+
+if arguments.output != None:
+    with open(arguments.output, 'w') as file:
+        json.dump(report, file, indent=4, sort_keys=True)
+else:
+    print(json.dumps(report, indent=4, sort_keys=True))
+
+if len(report.get('regressions', [])) > 0:
+    sys.exit(1)
+
+
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# Copyright (C) 2017-present Robert Griesel
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>
+
+
+import time, pickle, random
+
+from lemma.document.document import Document
+from lemma.infrastructure.service_locator import ServiceLocator
+import benchmarks.notes as notes
+
+
+def measure(samples, name, function, *parameters):
+    start_time = time.perf_counter()
+    function(*parameters)
+    samples.setdefault(name, []).append(time.perf_counter() - start_time)
+
+
+def load_document(html, id=1):
+    document = Document(id)
+    document.add_command('populate_from_html', html, ServiceLocator.get_notes_folder())
+    document.command_processor.reset_undo_stack()
+    return document
+
+
+def place_cursor(document, insert_index, selection_index=None):
+    if selection_index == None: selection_index = insert_index
+    document.cursor.set_state([[insert_index], [selection_index]])
+
+
+def load(size, repeat):
+    samples = dict()
+    html = notes.get_html(size)
+    for i in range(repeat):
+        measure(samples, 'load.populate_from_html', load_document, html)
+    return samples
+
+
+def typing(size, repeat):
+    samples = dict()
+    document = load_document(notes.get_html(size))
+    place_cursor(document, len(document.ast.root) // 2)
+
+    for i in range(40 * repeat):
+        measure(samples, 'typing.insert_text', document.add_command, 'insert_text', 'abcdefgh '[i % 9])
+    for i in range(4 * repeat):
+        measure(samples, 'typing.newline', document.add_command, 'newline')
+    return samples
+
+
+def deletion(size, repeat):
+    samples = dict()
+    document = load_document(notes.get_html(size))
+    middle = len(document.ast.root) // 2
+    place_cursor(document, middle)
+
+    for i in range(40 * repeat):
+        measure(samples, 'deletion.backspace', document.add_command, 'backspace')
+    for i in range(40 * repeat):
+        measure(samples, 'deletion.delete', document.add_command, 'delete')
+
+    for i in range(repeat):
+        place_cursor(document, middle // 2, middle + middle // 2)
+        measure(samples, 'deletion.delete_selection', document.add_command, 'delete_selection')
+        document.undo()
+    return samples
+
+
+def styling(size, repeat):
+    samples = dict()
+    document = load_document(notes.get_html(size))
+    middle = len(document.ast.root) // 2
+
+    for i in range(repeat):
+        place_cursor(document, middle - 500, middle + 500)
+        measure(samples, 'styling.add_tag', document.add_command, 'add_tag', 'bold')
+        measure(samples, 'styling.remove_tag', document.add_command, 'remove_tag', 'bold')
+        measure(samples, 'styling.set_paragraph_style', document.add_command, 'set_paragraph_style', 'h3')
+
+        document.add_command('select_all')
+        measure(samples, 'styling.add_tag_everywhere', document.add_command, 'add_tag', 'italic')
+        document.undo()
+    return samples
+
+
+def undo_redo(size, repeat):
+    samples = dict()
+    document = load_document(notes.get_html(size))
+    middle = len(document.ast.root) // 2
+    place_cursor(document, middle)
+
+    for i in range(40 * repeat):
+        document.add_command('insert_text', 'abcdefgh '[i % 9])
+    for i in range(40 * repeat):
+        measure(samples, 'undo_redo.undo_insert_text', document.undo)
+    for i in range(40 * repeat):
+        measure(samples, 'undo_redo.redo_insert_text', document.redo)
+
+    for i in range(repeat):
+        place_cursor(document, middle // 2, middle + middle // 2)
+        document.add_command('delete_selection')
+        measure(samples, 'undo_redo.undo_delete_selection', document.undo)
+        measure(samples, 'undo_redo.redo_delete_selection', document.redo)
+        document.undo()
+    return samples
+
+
+def layout(size, repeat):
+    samples = dict()
+    document = load_document(notes.get_html(size))
+
+    for i in range(repeat):
+        document.change_set.add_everything()
+        document.housekeeper.update()
+        document.layouter.cache.clear()
+        measure(samples, 'layout.full', document.layouter.update)
+
+        document.change_set.add_everything()
+        document.housekeeper.update()
+        measure(samples, 'layout.from_cache', document.layouter.update)
+    return samples
+
+
+def navigation(size, repeat):
+    samples = dict()
+    document = load_document(notes.get_html(size))
+    place_cursor(document, len(document.ast.root) // 2)
+    rng = random.Random(0)
+
+    for i in range(20 * repeat):
+        measure(samples, 'navigation.down', document.add_command, 'down')
+    for i in range(20 * repeat):
+        measure(samples, 'navigation.right', document.add_command, 'right')
+    for i in range(20 * repeat):
+        x, y = rng.randint(0, 670), rng.randint(0, int(document.layout.height))
+        measure(samples, 'navigation.move_cursor_to_xy', document.add_command, 'move_cursor_to_xy', x, y)
+    return samples
+
+
+def serialization(size, repeat):
+    samples = dict()
+    document = load_document(notes.get_html(size))
+    middle = len(document.ast.root) // 2
+
+    for i in range(repeat):
+        for paragraph in document.paragraphs:
+            paragraph.html = None
+            paragraph.plaintext = None
+        measure(samples, 'serialization.html', document.html_scanner.get_html)
+        measure(samples, 'serialization.plaintext', document.plaintext_scanner.get_plaintext)
+
+        place_cursor(document, middle // 2, middle + middle // 2)
+        start_time = time.perf_counter()
+        data = pickle.dumps(document.ast.get_subtree(*document.cursor.get_state()))
+        samples.setdefault('serialization.copy', []).append(time.perf_counter() - start_time)
+
+        place_cursor(document, middle)
+        start_time = time.perf_counter()
+        document.add_command('insert_subtree', pickle.loads(data))
+        samples.setdefault('serialization.paste', []).append(time.perf_counter() - start_time)
+        document.undo()
+    return samples
+
+
+def search(size, repeat):
+    ''' Filters notes the way the document list does, over fifty notes
+        making up size characters in total. '''
+
+    samples = dict()
+    documents = [load_document(notes.get_html(size // 50, 'Note ' + str(i), seed=i), id=i) for i in range(50)]
+    queries = [['lorem'], ['magna', 'aliqua'], ['nonexistent'], ['Note 7'], ['tempor', 'incididunt', 'labore']]
+
+    def filter_documents(terms):
+        return [document for document in documents if min(map(lambda x: x in document.plaintext or x in document.title, terms))]
+
+    for i in range(repeat):
+        for terms in queries:
+            measure(samples, 'search.filter_documents', filter_documents, terms)
+    return samples
+
+
+benchmarks = [load, typing, deletion, styling, undo_redo, layout, navigation, serialization, search]
+
+
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# Copyright (C) 2017-present Robert Griesel
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>
+
+
+''' Sets up what lemma.in sets up for the document engine, without
+    starting the application. '''
+
+import sys, os, os.path, tempfile
+
+sys.dont_write_bytecode = True
+
+source_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..')
+
+# keep the user's settings, notes and image store out of reach
+os.environ['XDG_CONFIG_HOME'] = tempfile.mkdtemp(prefix='lemma-benchmarks-')
+
+from lemma.infrastructure.font_manager import FontManager
+from lemma.infrastructure.service_locator import ServiceLocator
+
+
+def init():
+    ServiceLocator.init_resources_path(os.path.join(source_path, 'data', 'resources'))
+
+    font_path = os.path.join(ServiceLocator.get_resources_path(), 'fonts')
+    FontManager.add_font('book', os.path.join(font_path, 'newcomputermodern/otf/NewCM10-Book.otf'), size=19.407, line_height=28, ascend=19, descend=7)
+    FontManager.add_font('bold', os.path.join(font_path, 'newcomputermodern/otf/NewCM10-Bold.otf'), size=19.407, line_height=28, ascend=19, descend=7)
+    FontManager.add_font('bolditalic', os.path.join(font_path, 'newcomputermodern/otf/NewCM10-BoldItalic.otf'), size=19.407, line_height=28, ascend=19, descend=7)
+    FontManager.add_font('italic', os.path.join(font_path, 'newcomputermodern/otf/NewCM10-Italic.otf'), size=19.407, line_height=28, ascend=19, descend=7)
+    FontManager.add_font('math', os.path.join(font_path, 'newcomputermodern/otf/NewCMMath-Book.otf'), size=19.407, line_height=28, ascend=19, descend=7)
+    FontManager.add_font('teaser', os.path.join(font_path, 'newcomputermodern/otf/NewCM08-Book.otf'), size=14, line_height=28, ascend=19, descend=7)
+    FontManager.add_font('h1', os.path.join(font_path, 'newcomputermodern/otf/NewCMSans10-Bold.otf'), size=32, line_height=40, ascend=28, descend=8)
+    FontManager.add_font('h2', os.path.join(font_path, 'newcomputermodern/otf/NewCMSans10-Bold.otf'), size=28, line_height=35, ascend=25, descend=7)
+    FontManager.add_font('h3', os.path.join(font_path, 'newcomputermodern/otf/NewCMSans10-Bold.otf'), size=24, line_height=35, ascend=22, descend=7)
+    FontManager.add_font('h4', os.path.join(font_path, 'newcomputermodern/otf/NewCMSans10-Book.otf'), size=24, line_height=35, ascend=22, descend=7)
+    FontManager.add_font('h5', os.path.join(font_path, 'newcomputermodern/otf/NewCMSans10-BookOblique.otf'), size=24, line_height=35, ascend=22, descend=7)
+    FontManager.add_font('h6', os.path.join(font_path, 'newcomputermodern/otf/NewCMSans10-Book.otf'), size=19.407, line_height=28, ascend=19, descend=7)
+
+    os.makedirs(ServiceLocator.get_notes_folder(), exist_ok=True)
+
+
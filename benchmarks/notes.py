@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# Copyright (C) 2017-present Robert Griesel
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>
+
+
+import random
+
+
+words = ['lorem', 'ipsum', 'dolor', 'sit', 'amet', 'consectetur', 'adipiscing', 'elit', 'sed', 'do', 'eiusmod', 'tempor', 'incididunt', 'ut', 'labore', 'et', 'dolore', 'magna', 'aliqua', 'enim', 'ad', 'minim', 'veniam', 'quis', 'nostrud', 'exercitation']
+
+
+def get_html(size, title='Benchmark', seed=0):
+    ''' A note of about size characters. Paragraphs run a few hundred
+        characters and carry some bold, italic and linked words, every
+        tenth one is a heading. '''
+
+    rng = random.Random(seed)
+    body = ''
+    length, number = 0, 0
+
+    while length < size:
+        if number % 10 == 0:
+            text = ' '.join(rng.choice(words) for i in range(4))
+            body += '<h2>' + text + '</h2>\n'
+        else:
+            text = ''
+            segments = []
+            while len(text) < 300:
+                word = rng.choice(words)
+                text += word + ' '
+                kind = rng.random()
+                if kind < 0.05: segments.append('<strong>' + word + '</strong>')
+                elif kind < 0.10: segments.append('<em>' + word + '</em>')
+                elif kind < 0.12: segments.append('<a href="' + rng.choice(words) + '">' + word + '</a>')
+                else: segments.append(word)
+            body += '<p>' + ' '.join(segments) + '</p>\n'
+
+        length += len(text) + 1
+        number += 1
+
+    return '<html><head><title>' + title + '</title></head><body>' + body + '</body></html>'
+
+
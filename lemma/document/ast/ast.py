@@ -27,18 +27,91 @@ class AST(object):
         self.root.insert(0, Node('EOL', '\n'))
 
     def delete_range(self, first_node, last_node):
-        deleted_nodes = []
-        while first_node != last_node:
-            deleted_nodes += [first_node]
-            parent = first_node.parent
-            index = parent.index(first_node)
-            parent.remove(first_node)
-            first_node = parent[index]
-
-        return deleted_nodes
-
-    def delete_node(self, node):
-        node.parent.remove(node.parent[node.parent.index(node)])
+        ''' Removes the nodes from first_node up to, but not including,
+            last_node and returns them in order. '''
+
+        parent = first_node.parent
+        return parent.remove_range(parent.index(first_node), parent.index(last_node))
+
+    def delete_nodes_at(self, position, number_of_nodes):
+        ''' Removes a contiguous run of siblings, starting at position. '''
+
+        parent = self.root.get_node_at_position(position[:-1])
+        return parent.remove_range(position[-1], position[-1] + number_of_nodes)
+
+    def insert_nodes_before(self, node, nodes):
+        node.parent.insert_nodes(node.parent.index(node), nodes)
+
+    def get_node_runs(self, nodes):
+        ''' A compact copy of nodes for the undo history: adjacent
+            nodes of the same type, style and link are merged into
+            (type, values, style, link) runs. '''
+
+        runs = []
+        for node in nodes:
+            if node.type != 'image' and len(runs) > 0 and runs[-1][0] == node.type and runs[-1][2] == node.style and runs[-1][3] is node.link:
+                runs[-1][1].append(node.value)
+            else:
+                runs.append([node.type, [node.value], node.style, node.link])
+
+        return [(node_type, values if node_type == 'image' else ''.join(values), style, link) for node_type, values, style, link in runs]
+
+    def get_nodes_from_runs(self, runs):
+        nodes = []
+        for node_type, values, style, link in runs:
+            for value in values:
+                node = Node(node_type, value)
+                node.style = style
+                node.link = link
+                nodes.append(node)
+
+        return nodes
+
+    def get_style_runs(self, nodes):
+        ''' Groups nodes into runs of adjacent siblings sharing a style.
+            Returns (first_position, last_position, style) tuples. '''
+
+        return self.get_runs(nodes, lambda node: node.style)
+
+    def set_style(self, first_position, last_position, style):
+        for node in self.get_nodes_between(first_position, last_position):
+            node.style = style
+
+    def get_link_runs(self, nodes):
+        ''' Groups nodes into runs of adjacent siblings sharing a link.
+            Returns (first_position, last_position, link) tuples. '''
+
+        return self.get_runs(nodes, lambda node: node.link)
+
+    def set_link(self, first_position, last_position, link):
+        for node in self.get_nodes_between(first_position, last_position):
+            node.link = link
+
+    def get_runs(self, nodes, get_value):
+        runs = []
+        prev_node = None
+        for node in nodes:
+            if prev_node != None and node.prev_sibling == prev_node:
+                position = position[:-1] + (position[-1] + 1,)
+                if get_value(node) is runs[-1][2]:
+                    runs[-1][1] = position
+                    prev_node = node
+                    continue
+            else:
+                position = node.get_position_tuple()
+            runs.append([position, position, get_value(node)])
+            prev_node = node
+
+        return [tuple(run) for run in runs]
+
+    def get_nodes_between(self, first_position, last_position):
+        ''' The siblings from first_position up to and including last_position. '''
+
+        parent = self.root.get_node_at_position(first_position[:-1])
+        return parent.children[first_position[-1]:last_position[-1] + 1]
+
+    def get_node_at_position(self, position):
+        return self.root.get_node_at_position(position)
 
     def get_subtree(self, pos1, pos2):
         pos1, pos2 = min(pos1, pos2), max(pos1, pos2)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# Copyright (C) 2017-present Robert Griesel
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>
+
+
+class ChangeSet(object):
+    ''' Collects the paragraphs touched by commands since the last
+        update. Paragraphs are identified by their last node. '''
+
+    def __init__(self):
+        self.paragraph_ends = set()
+        self.includes_everything = False
+
+    def add_node(self, node):
+        self.add_range(node, node)
+
+    def add_range(self, first_node, last_node):
+        parent = first_node.parent
+        if not parent.is_root():
+            self.add_everything()
+            return
+
+        if parent.index(last_node) < parent.index(first_node):
+            first_node, last_node = last_node, first_node
+
+        node = first_node
+        while node != last_node:
+            if node.is_last_in_line():
+                self.paragraph_ends.add(node)
+            node = node.next_sibling
+        while not node.is_last_in_line():
+            node = node.next_sibling
+        self.paragraph_ends.add(node)
+
+    def is_empty(self):
+        return len(self.paragraph_ends) == 0 and not self.includes_everything
+
+    def add_everything(self):
+        self.includes_everything = True
+
+    def reset(self):
+        self.paragraph_ends = set()
+        self.includes_everything = False
+
+
@@ -94,26 +94,29 @@ class Cursor():
     def get_selection_position(self):
         return self.node_selection.get_position()
 
+    def is_insert_before_selection(self):
+        return self.node_insert.get_position_tuple() < self.node_selection.get_position_tuple()
+
     def get_first_node(self):
-        if self.get_insert_position() < self.get_selection_position():
+        if self.is_insert_before_selection():
             return self.node_insert
         else:
             return self.node_selection
 
     def get_last_node(self):
-        if self.get_insert_position() < self.get_selection_position():
+        if self.is_insert_before_selection():
             return self.node_selection
         else:
             return self.node_insert
 
     def get_first_cursor_pos(self):
-        if self.get_insert_position() < self.get_selection_position():
+        if self.is_insert_before_selection():
             return self.get_insert_position()
         else:
             return self.get_selection_position()
 
     def get_last_cursor_pos(self):
-        if self.get_insert_position() < self.get_selection_position():
+        if self.is_insert_before_selection():
             return self.get_selection_position()
         else:
             return self.get_insert_position()
@@ -16,20 +16,43 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>
 
 from lemma.document.ast.position import Position
+from lemma.document.ast.node_list import NodeList
+from lemma.document.ast.style import Style
 from lemma.db.character_db import CharacterDB
 
 
 class Node():
 
+    __slots__ = ('parent', 'prev_sibling', 'next_sibling', 'children', 'chunk', 'type', 'value', 'box', 'style', 'link', 'position_cache', 'version')
+
+    # the version of a tree is kept on its root, and changes with every edit to it
+    last_version = 0
+
     def __init__(self, node_type, value=None):
         self.parent = None
-        self.children = []
+        self.prev_sibling = None
+        self.next_sibling = None
+        self.children = NodeList() if node_type == 'list' else ()
+        self.chunk = None
         self.type = node_type
         self.value = value
         self.box = None
-        self.tags = set()
+        self.style = Style.get()
         self.link = None
-        self.paragraph_style = 'p'
+        self.position_cache = (-1, None)
+        self.version = 0
+
+    @property
+    def tags(self): return self.style.tags
+
+    @tags.setter
+    def tags(self, tags): self.style = Style.get(tags, self.style.paragraph_style)
+
+    @property
+    def paragraph_style(self): return self.style.paragraph_style
+
+    @paragraph_style.setter
+    def paragraph_style(self, paragraph_style): self.style = Style.get(self.style.tags, paragraph_style)
 
     def set_parent(self, parent):
         self.parent = parent
@@ -38,9 +61,32 @@ class Node():
         self.box = box
 
     def insert(self, index, node):
+        if self.children == (): self.children = []
+        self.update_version()
         self.children.insert(index, node)
         node.set_parent(self)
 
+        node.prev_sibling = self.children[index - 1] if index > 0 else None
+        node.next_sibling = self.children[index + 1] if index < len(self.children) - 1 else None
+        if node.prev_sibling != None: node.prev_sibling.next_sibling = node
+        if node.next_sibling != None: node.next_sibling.prev_sibling = node
+
+    def insert_nodes(self, index, nodes):
+        if len(nodes) == 0: return
+        if self.children == (): self.children = []
+        self.update_version()
+
+        self.children[index:index] = nodes
+        prev_sibling = self.children[index - 1] if index > 0 else None
+        next_sibling = self.children[index + len(nodes)] if index + len(nodes) < len(self.children) else None
+        for node in nodes:
+            node.set_parent(self)
+            node.prev_sibling = prev_sibling
+            if prev_sibling != None: prev_sibling.next_sibling = node
+            prev_sibling = node
+        nodes[-1].next_sibling = next_sibling
+        if next_sibling != None: next_sibling.prev_sibling = nodes[-1]
+
     def insert_after(self, child, node):
         index = self.index(child)
         self.insert(index, node)
@@ -53,20 +99,79 @@ class Node():
         self.insert(len(self.children), node)
 
     def remove(self, node):
-        self.children.remove(node)
+        del(self.children[self.index(node)])
+        self.update_version()
         node.set_parent(None)
+        node.update_version()
+
+        if node.prev_sibling != None: node.prev_sibling.next_sibling = node.next_sibling
+        if node.next_sibling != None: node.next_sibling.prev_sibling = node.prev_sibling
+        node.prev_sibling = None
+        node.next_sibling = None
+
+    def remove_range(self, start, end):
+        nodes = self.children[start:end]
+        if len(nodes) == 0: return nodes
+
+        del(self.children[start:end])
+        self.update_version()
+        prev_sibling, next_sibling = nodes[0].prev_sibling, nodes[-1].next_sibling
+        if prev_sibling != None: prev_sibling.next_sibling = next_sibling
+        if next_sibling != None: next_sibling.prev_sibling = prev_sibling
+        for node in nodes:
+            node.set_parent(None)
+            node.prev_sibling = None
+            node.next_sibling = None
+            node.update_version()
+        return nodes
 
     def index(self, node):
         return self.children.index(node)
 
+    def __getstate__(self):
+        state = {name: getattr(self, name) for name in Node.__slots__ if hasattr(self, name)}
+        state['prev_sibling'] = None
+        state['next_sibling'] = None
+        state.pop('chunk', None)
+        state.pop('position_cache', None)
+        state.pop('version', None)
+        return state
+
+    def __setstate__(self, state):
+        self.position_cache = (-1, None)
+        self.version = 0
+        for name, value in state.items():
+            setattr(self, name, value)
+
     def get_position(self):
+        return Position(*self.get_position_tuple())
+
+    def get_position_tuple(self):
+        ''' The position as a tuple, cached until the tree changes. '''
+
+        root_version = self.get_root().version
+        version, position = self.position_cache
+        if version != root_version:
+            if self.is_root():
+                position = ()
+            else:
+                position = self.parent.get_position_tuple() + (self.parent.index(self),)
+            self.position_cache = (root_version, position)
+
+        return position
+
+    def get_root(self):
         node = self
-        position = list()
-        while not node.is_root():
-            position.insert(0, node.parent.index(node))
+        while node.parent != None:
             node = node.parent
+        return node
 
-        return Position(*position)
+    def update_version(self):
+        ''' Versions are unique across trees, so a node moving between
+            trees never matches a stale cache entry. '''
+
+        Node.last_version += 1
+        self.get_root().version = Node.last_version
 
     def __len__(self): return len(self.children)
     def __iter__(self): return self.children.__iter__()
@@ -74,7 +179,7 @@ class Node():
     def __getitem__(self, key):
         if isinstance(key, slice):
             node = Node(self.type, self.value)
-            node.tags = self.tags
+            node.style = self.style
             node.link = self.link
             node.children = self.children.__getitem__(key)
             return node
@@ -91,8 +196,8 @@ class Node():
         return ancestors
 
     def is_leaf(self): return len(self.children) == 0
-    def is_first_in_parent(self): return self == self.parent[0]
-    def is_last_in_parent(self): return self == self.parent[-1]
+    def is_first_in_parent(self): return self.prev_sibling == None
+    def is_last_in_parent(self): return self.next_sibling == None
     def is_root(self): return self.parent == None
     def is_mathsymbol(self): return self.type == 'mathsymbol'
     def is_char(self): return self.type == 'char'
@@ -168,21 +273,12 @@ class Node():
         return (self.line_start().get_position(), self.line_end().get_position())
 
     def get_xy(self):
-        box = self.box
-        x, y = (0, 0)
-
-        while not box.parent == None:
-            new_x, new_y = box.parent.get_xy_at_child(box)
-            x += new_x
-            y += new_y
-            box = box.parent
-
-        return x, y
+        return self.box.get_xy()
 
     def prev(self):
         node = self
-        if node != node.parent[0]:
-            node = node.parent[node.parent.index(node) - 1]
+        if node.prev_sibling != None:
+            node = node.prev_sibling
             while not node.is_leaf():
                 node = node[-1]
             return node
@@ -197,20 +293,19 @@ class Node():
         if not node.is_leaf():
             node = node[0]
         else:
-            while not node.is_root() and node.parent.index(node) == len(node.parent) - 1:
+            while not node.is_root() and node.next_sibling == None:
                 node = node.parent
             if node.is_root():
                 return None
             else:
-                node = node.parent[node.parent.index(node) + 1]
+                node = node.next_sibling
 
         return node
 
     def prev_no_descent(self):
         node = self
-        if node != node.parent[0]:
-            index = node.parent.index(node) - 1
-            node = node.parent[index]
+        if node.prev_sibling != None:
+            node = node.prev_sibling
 
         elif not node.parent.is_root():
             node = node.parent
@@ -219,31 +314,24 @@ class Node():
 
     def next_no_descent(self):
         node = self
-        if node != node.parent[-1]:
-            index = node.parent.index(node) + 1
-            node = node.parent[index]
+        if node.next_sibling != None:
+            node = node.next_sibling
 
         else:
-            while not node.is_root() and node.parent.index(node) == len(node.parent) - 1:
+            while not node.is_root() and node.next_sibling == None:
                 node = node.parent
             if node.is_root():
                 return
             else:
-                node = node.parent[node.parent.index(node) + 1]
+                node = node.next_sibling
 
         return node
 
     def prev_in_parent(self):
-        if self != self.parent[0]:
-            index = self.parent.index(self) - 1
-            return self.parent[index]
-        return None
+        return self.prev_sibling
 
     def next_in_parent(self):
-        if self != self.parent[-1]:
-            index = self.parent.index(self) + 1
-            return self.parent[index]
-        return None
+        return self.next_sibling
 
     def line_start(self):
         node = self
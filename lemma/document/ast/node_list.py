@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# Copyright (C) 2017-present Robert Griesel
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>
+
+import itertools
+
+
+class Chunk(list):
+
+    def __init__(self, nodes=[]):
+        list.__init__(self, nodes)
+        self.owner = None
+        self.number = 0
+
+
+class NodeList(object):
+    ''' The children of a node, stored as a list of chunks. Nodes know
+        their chunk and the chunk lengths are kept in a Fenwick tree,
+        so inserting, removing and looking up a node by index or an
+        index by node don't shift or scan the whole sequence. '''
+
+    max_chunk_size = 512
+    min_chunk_size = 64
+
+    def __init__(self):
+        self.chunks = []
+        self.tree = [0]
+        self.length = 0
+
+    def __len__(self): return self.length
+    def __iter__(self): return itertools.chain.from_iterable(self.chunks)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.length)
+            if step != 1:
+                return list(self)[key]
+
+            result = []
+            while start < stop:
+                number, offset = self.locate(start)
+                chunk = self.chunks[number]
+                result += chunk[start - offset:stop - offset]
+                start = offset + len(chunk)
+            return result
+
+        if key < 0: key += self.length
+        if key < 0 or key >= self.length: raise IndexError('index out of range')
+
+        number, offset = self.locate(key)
+        return self.chunks[number][key - offset]
+
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            self.delete_slice(index)
+            return
+
+        if index < 0: index += self.length
+        if index < 0 or index >= self.length: raise IndexError('index out of range')
+
+        number, offset = self.locate(index)
+        chunk = self.chunks[number]
+        node = chunk.pop(index - offset)
+        node.chunk = None
+        self.length -= 1
+        self.add_to_tree(number, -1)
+
+        if len(chunk) == 0:
+            del(self.chunks[number])
+            self.rebuild()
+        elif len(chunk) < self.min_chunk_size and len(self.chunks) > 1:
+            self.merge(number if number + 1 < len(self.chunks) else number - 1)
+
+    def __setitem__(self, key, nodes):
+        ''' Only inserting by assigning to an empty slice is supported. '''
+
+        start, stop, step = key.indices(self.length)
+        if step != 1 or stop > start: raise ValueError('only empty slices can be assigned')
+
+        nodes = list(nodes)
+        if len(nodes) == 0: return
+
+        if len(self.chunks) == 0:
+            self.chunks.append(Chunk())
+            self.rebuild()
+        if start == self.length:
+            number, offset = len(self.chunks) - 1, self.length - len(self.chunks[-1])
+        else:
+            number, offset = self.locate(start)
+
+        chunk = self.chunks[number]
+        chunk[start - offset:start - offset] = nodes
+        self.length += len(nodes)
+
+        if len(chunk) <= self.max_chunk_size:
+            for node in nodes:
+                node.chunk = chunk
+            self.add_to_tree(number, len(nodes))
+        else:
+            size = self.max_chunk_size // 2
+            new_chunks = [Chunk(chunk[i:i + size]) for i in range(0, len(chunk), size)]
+            for new_chunk in new_chunks:
+                for node in new_chunk:
+                    node.chunk = new_chunk
+            self.chunks[number:number + 1] = new_chunks
+            self.rebuild()
+
+    def delete_slice(self, key):
+        start, stop, step = key.indices(self.length)
+        if step != 1: raise ValueError('only contiguous slices can be deleted')
+        if stop <= start: return
+
+        number, offset = self.locate(start)
+        first_number = number
+        while offset < stop:
+            chunk = self.chunks[number]
+            chunk_length = len(chunk)
+            for node in chunk[max(0, start - offset):stop - offset]:
+                node.chunk = None
+            del(chunk[max(0, start - offset):stop - offset])
+            offset += chunk_length
+            number += 1
+        self.length -= stop - start
+
+        self.chunks[first_number:number] = [chunk for chunk in self.chunks[first_number:number] if len(chunk) > 0]
+        self.rebuild()
+        if first_number < len(self.chunks) - 1 and len(self.chunks[first_number]) < self.min_chunk_size:
+            self.merge(first_number)
+
+    def insert(self, index, node):
+        index = max(0, min(self.length, index if index >= 0 else index + self.length))
+
+        if len(self.chunks) == 0:
+            self.chunks.append(Chunk())
+            self.rebuild()
+
+        if index == self.length:
+            number, offset = len(self.chunks) - 1, self.length - len(self.chunks[-1])
+        else:
+            number, offset = self.locate(index)
+        chunk = self.chunks[number]
+        chunk.insert(index - offset, node)
+        node.chunk = chunk
+        self.length += 1
+        self.add_to_tree(number, 1)
+
+        if len(chunk) > self.max_chunk_size:
+            self.split(number)
+
+    def index(self, node):
+        chunk = getattr(node, 'chunk', None)
+        if chunk == None or chunk.owner != self:
+            raise ValueError('node is not in list')
+
+        return self.get_offset(chunk.number) + chunk.index(node)
+
+    def split(self, number):
+        chunk = self.chunks[number]
+        new_chunk = Chunk(chunk[len(chunk) // 2:])
+        del(chunk[len(chunk) // 2:])
+        for node in new_chunk:
+            node.chunk = new_chunk
+        self.chunks.insert(number + 1, new_chunk)
+        self.rebuild()
+
+    def merge(self, number):
+        chunk, next_chunk = self.chunks[number], self.chunks[number + 1]
+        if len(chunk) + len(next_chunk) > self.max_chunk_size: return
+
+        for node in next_chunk:
+            node.chunk = chunk
+        chunk += next_chunk
+        del(self.chunks[number + 1])
+        self.rebuild()
+
+    def rebuild(self):
+        self.tree = [0] * (len(self.chunks) + 1)
+        for number, chunk in enumerate(self.chunks):
+            chunk.owner = self
+            chunk.number = number
+            self.add_to_tree(number, len(chunk))
+
+    def add_to_tree(self, number, delta):
+        number += 1
+        while number < len(self.tree):
+            self.tree[number] += delta
+            number += number & -number
+
+    def get_offset(self, number):
+        ''' Number of nodes in the chunks before the given one. '''
+
+        offset = 0
+        while number > 0:
+            offset += self.tree[number]
+            number -= number & -number
+        return offset
+
+    def locate(self, index):
+        ''' Returns the number of the chunk containing index and the
+            offset of that chunk. '''
+
+        number, offset = 0, 0
+        step = 1 << (len(self.tree).bit_length())
+        while step > 0:
+            if number + step < len(self.tree) and offset + self.tree[number + step] <= index:
+                number += step
+                offset += self.tree[number]
+            step >>= 1
+        return number, offset
+
+    def __getstate__(self):
+        return {'nodes': list(self)}
+
+    def __setstate__(self, state):
+        self.__init__()
+        self[0:0] = state['nodes']
+
+
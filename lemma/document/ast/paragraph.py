@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# Copyright (C) 2017-present Robert Griesel
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>
+
+
+class Paragraph(object):
+    ''' A line of the document, from its first node up to and including
+        the EOL that ends it. Pipeline stages cache their results here,
+        a paragraph gets replaced as soon as its content changes. '''
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+
+        self.links = None
+        self.images = None
+        self.lines = None
+        self.layout_width = None
+        self.html = None
+        self.plaintext = None
+
+    def get_first_node(self): return self.nodes[0]
+    def get_last_node(self): return self.nodes[-1]
+
+
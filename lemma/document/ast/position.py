@@ -32,20 +32,6 @@ class Position(object):
     def __ge__(self, other): return not self.__lt__(other)
 
     def __lt__(self, other):
-        if len(self) < len(other):
-            for i in range(len(self)):
-                if self[i] < other[i]: return True
-                if self[i] > other[i]: return False
-            return True
-        if len(self) > len(other):
-            for i in range(len(other)):
-                if self[i] < other[i]: return True
-                if self[i] > other[i]: return False
-            return False
-        else:
-            for i in range(len(self)):
-                if self[i] < other[i]: return True
-                if self[i] > other[i]: return False
-            return False
+        return tuple(self) < tuple(other)
 
 
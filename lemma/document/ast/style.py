@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# Copyright (C) 2017-present Robert Griesel
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>
+
+
+class Style(object):
+    ''' Formatting of a node. Styles are immutable and shared by all
+        nodes that look the same, get them with Style.get(). Equal tag
+        sets are shared as well, so runs can be told apart by identity. '''
+
+    __slots__ = ('tags', 'paragraph_style')
+
+    styles = dict()
+    tag_sets = dict()
+
+    def get(tags=frozenset(), paragraph_style='p'):
+        key = (frozenset(tags), paragraph_style)
+        if key not in Style.styles:
+            style = object.__new__(Style)
+            object.__setattr__(style, 'tags', Style.tag_sets.setdefault(key[0], key[0]))
+            object.__setattr__(style, 'paragraph_style', paragraph_style)
+            Style.styles[key] = style
+        return Style.styles[key]
+
+    def __setattr__(self, name, value):
+        raise AttributeError('styles are immutable')
+
+    def __reduce__(self):
+        return (Style.get, (self.tags, self.paragraph_style))
+
+
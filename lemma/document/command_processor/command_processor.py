@@ -15,18 +15,40 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>
 
+import os, os.path, pickle
+
+from lemma.infrastructure.profiler import Profiler
 import lemma.document.commands.composite as composite
+from lemma.document.widgets.image import Image
 
 
 class CommandProcessor(object):
+    ''' Runs commands and keeps them for undo and redo. Once the history
+        grows beyond the memory budget its oldest part is written to
+        the spill file, if there is one, or dropped otherwise. '''
 
     def __init__(self, document):
         self.document = document
         self.commands = list()
+        self.command_sizes = list()
         self.commands_preedit = list()
         self.last_command = -1
         self.command_buffer = None
 
+        self.memory_budget = 16 * 1024 * 1024
+        self.size = 0
+        self.spill_pathname = None
+        self.spilled_batches = list()
+        self.spill_failed = False
+
+    def set_memory_budget(self, memory_budget):
+        self.memory_budget = memory_budget
+
+    def set_spill_pathname(self, pathname):
+        self.remove_spill_file()
+        self.spill_pathname = pathname
+        self.spill_failed = False
+
     def begin_chain_of_commands(self):
         self.command_buffer = []
 
@@ -40,18 +62,31 @@ class CommandProcessor(object):
             self.command_buffer.append(command)
             return
 
+        start_time = Profiler.get_time()
         command.run(self.document)
+        Profiler.add_time('command.' + command.__module__.split('.')[-1], start_time, self.document.id)
         self.commands_preedit.append(command)
 
         if command.is_undo_checkpoint:
-            self.commands = self.commands[:self.last_command + 1] + self.commands_preedit
+            self.size -= sum(self.command_sizes[self.last_command + 1:])
+            del(self.commands[self.last_command + 1:])
+            del(self.command_sizes[self.last_command + 1:])
+
+            for command in self.commands_preedit:
+                size = self.get_size(command)
+                self.commands.append(command)
+                self.command_sizes.append(size)
+                self.size += size
             self.last_command += len(self.commands_preedit)
             self.commands_preedit = list()
+
+            if self.size > self.memory_budget:
+                self.remove_oldest_commands()
             self.document.update_last_modified()
         self.document.update()
 
     def can_undo(self):
-        return self.last_command >= 0
+        return self.last_command >= 0 or len(self.spilled_batches) > 0
 
     def can_redo(self):
         return self.last_command < len(self.commands) - 1
@@ -65,32 +100,126 @@ class CommandProcessor(object):
             return None
 
     def undo(self):
+        start_time = Profiler.get_time()
         for command in reversed(self.commands_preedit):
             command.undo(self.document)
         self.commands_preedit = list()
 
-        for command in reversed(self.commands[:self.last_command + 1]):
+        while True:
+            if self.last_command < 0 and len(self.spilled_batches) > 0:
+                self.restore_spilled_commands()
+            if self.last_command < 0: break
+
+            command = self.commands[self.last_command]
             command.undo(self.document)
             self.last_command -= 1
             if command.is_undo_checkpoint:
                 self.document.update_last_modified()
                 break
+        Profiler.add_time('undo', start_time, self.document.id)
 
         self.document.update()
 
     def redo(self):
-        for command in self.commands[self.last_command + 1:]:
+        start_time = Profiler.get_time()
+        while self.can_redo():
+            command = self.commands[self.last_command + 1]
             command.run(self.document)
             self.last_command += 1
             if command.is_undo_checkpoint:
                 self.document.update_last_modified()
                 break
+        Profiler.add_time('redo', start_time, self.document.id)
 
         self.document.update()
 
     def reset_undo_stack(self):
         self.commands = list()
+        self.command_sizes = list()
         self.commands_preedit = list()
         self.last_command = -1
+        self.size = 0
+        self.remove_spill_file()
+
+    def remove_oldest_commands(self):
+        ''' Removes whole undo steps from the start of the history until
+            it takes up three quarters of the budget, so this runs only
+            every once in a while. The newest step is always kept, even
+            if it is larger than the budget by itself. '''
+
+        size, number = 0, 0
+        for index in range(self.last_command):
+            size += self.command_sizes[index]
+            if self.commands[index].is_undo_checkpoint:
+                number = index + 1
+                removed_size = size
+                if self.size - size <= self.memory_budget * 3 / 4: break
+        if number == 0: return
+
+        batch = self.commands[:number]
+        if self.spill_pathname != None and not self.spill_failed:
+            if not self.spill_commands(batch):
+                self.spill_failed = True
+                return
+        else:
+            # older batches in the spill file can't follow a gap in the history
+            self.remove_spill_file()
+
+        del(self.commands[:number])
+        del(self.command_sizes[:number])
+        self.last_command -= number
+        self.size -= removed_size
+        assert self.last_command >= 0 and self.commands[self.last_command].is_undo_checkpoint, 'newest undo step removed'
+
+    def spill_commands(self, commands):
+        ''' Appends commands to the spill file. If that fails the caller
+            keeps them in memory, and spilling stays off from then on. '''
+
+        try:
+            data = pickle.dumps(commands)
+            with open(self.spill_pathname, 'ab') as file:
+                offset = file.tell()
+                file.write(data)
+        except (pickle.PicklingError, TypeError, AttributeError, OSError):
+            return False
+
+        self.spilled_batches.append((offset, len(data)))
+        return True
+
+    def restore_spilled_commands(self):
+        offset, length = self.spilled_batches.pop()
+        try:
+            with open(self.spill_pathname, 'r+b') as file:
+                file.seek(offset)
+                commands = pickle.loads(file.read(length))
+                file.truncate(offset)
+        except (pickle.UnpicklingError, EOFError, OSError):
+            self.spilled_batches = list()
+            return
+
+        self.commands = commands + self.commands
+        self.command_sizes = [self.get_size(command) for command in commands] + self.command_sizes
+        self.last_command += len(commands)
+        self.size += sum(self.command_sizes[:len(commands)])
+
+    def remove_spill_file(self):
+        self.spilled_batches = list()
+        if self.spill_pathname != None and os.path.exists(self.spill_pathname):
+            os.remove(self.spill_pathname)
+
+    def get_size(self, value):
+        ''' A rough estimate of the memory held by a command, in bytes. '''
+
+        if isinstance(value, str):
+            return 50 + len(value)
+        if isinstance(value, (list, tuple)):
+            return 56 + sum(8 + self.get_size(item) for item in value)
+        if isinstance(value, dict):
+            return 232 + sum(8 + self.get_size(item) for item in value.values())
+        if hasattr(value, 'run') and hasattr(value, 'undo'):
+            return 56 + self.get_size(vars(value))
+        if isinstance(value, Image):
+            return 56 + value.get_size()
+        return 32
 
 
@@ -30,21 +30,23 @@ class Command():
 
     def run(self, document):
         self.state['cursor_state_before'] = document.cursor.get_state()
-        self.state['nodes_added'] = []
 
         document.cursor.set_state(self.positions)
         char_nodes = [node for node in document.ast.get_subtree(*document.cursor.get_state()) if node.is_char()]
-        prev_links = []
-        for node in char_nodes:
-            prev_links.append(node.link)
-            node.link = Link(self.target)
-        self.state['nodes_and_prev_target'] = list(zip(char_nodes, prev_links))
+        self.state['link_runs'] = document.ast.get_link_runs(char_nodes)
+        link = Link(self.target)
+        for first_position, last_position, prev_link in self.state['link_runs']:
+            document.ast.set_link(first_position, last_position, link)
+        if len(char_nodes) > 0:
+            document.change_set.add_range(char_nodes[0], char_nodes[-1])
 
         document.cursor.set_state(self.state['cursor_state_before'])
 
     def undo(self, document):
-        for item in self.state['nodes_and_prev_target']:
-            item[0].link = item[1]
+        for first_position, last_position, prev_link in self.state['link_runs']:
+            document.ast.set_link(first_position, last_position, prev_link)
+        if len(self.state['link_runs']) > 0:
+            document.change_set.add_range(document.ast.get_node_at_position(self.state['link_runs'][0][0]), document.ast.get_node_at_position(self.state['link_runs'][-1][1]))
 
         document.set_scroll_insert_on_screen_after_layout_update()
 
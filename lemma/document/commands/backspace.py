@@ -25,22 +25,23 @@ class Command():
 
     def run(self, document):
         self.state['cursor_state_before'] = document.cursor.get_state()
-        self.state['deleted_nodes'] = []
+        self.state['deleted_runs'] = []
 
         node = document.cursor.get_insert_node()
         if not node.is_first_in_parent() or len(node.parent) == 1:
             document.cursor.move_insert_left_with_selection()
             first_node, last_node = document.cursor.get_first_node(), document.cursor.get_last_node()
-            self.state['deleted_nodes'] = document.ast.delete_range(first_node, last_node)
+            self.state['deleted_runs'] = document.ast.get_node_runs(document.ast.delete_range(first_node, last_node))
             document.cursor.move_insert_to_node(last_node)
+            document.change_set.add_node(last_node)
 
-        self.is_undo_checkpoint = (len(self.state['deleted_nodes']) > 0)
+        self.is_undo_checkpoint = (len(self.state['deleted_runs']) > 0)
         document.set_scroll_insert_on_screen_after_layout_update()
 
     def undo(self, document):
-        for node in self.state['deleted_nodes']:
-            insert = document.cursor.get_insert_node()
-            insert.parent.insert_before(insert, node)
+        document.ast.insert_nodes_before(document.cursor.get_insert_node(), document.ast.get_nodes_from_runs(self.state['deleted_runs']))
+        if len(self.state['deleted_runs']) > 0:
+            document.change_set.add_node(document.cursor.get_insert_node())
         document.cursor.set_state(self.state['cursor_state_before'])
         document.set_scroll_insert_on_screen_after_layout_update()
 
@@ -21,21 +21,32 @@ class Command():
     def __init__(self, first_node, last_node):
         self.first_node = first_node
         self.last_node = last_node
+        self.first_position = None
+        self.number_of_nodes = None
         self.is_undo_checkpoint = True
         self.update_implicit_x_position = False
         self.state = dict()
 
     def run(self, document):
         self.state['cursor_state_before'] = document.cursor.get_state()
-        self.state['deleted_nodes'] = document.ast.delete_range(self.first_node, self.last_node)
 
-        self.is_undo_checkpoint = (len(self.state['deleted_nodes']) > 0)
+        # the nodes are replaced on undo, so redo has to work from positions
+        if self.first_node != None:
+            self.first_position = self.first_node.get_position_tuple()
+            self.number_of_nodes = self.last_node.get_position_tuple()[-1] - self.first_position[-1]
+            self.first_node, self.last_node = None, None
+
+        deleted_nodes = document.ast.delete_nodes_at(self.first_position, self.number_of_nodes)
+        self.state['deleted_runs'] = document.ast.get_node_runs(deleted_nodes)
+        document.change_set.add_node(document.ast.root.get_node_at_position(self.first_position))
+
+        self.is_undo_checkpoint = (len(self.state['deleted_runs']) > 0)
         document.set_scroll_insert_on_screen_after_layout_update()
 
     def undo(self, document):
-        insert = self.last_node
-        for node in self.state['deleted_nodes']:
-            insert.parent.insert_before(insert, node)
+        last_node = document.ast.root.get_node_at_position(self.first_position)
+        document.ast.insert_nodes_before(last_node, document.ast.get_nodes_from_runs(self.state['deleted_runs']))
+        document.change_set.add_node(last_node)
         document.cursor.set_state(self.state['cursor_state_before'])
         document.set_scroll_insert_on_screen_after_layout_update()
 
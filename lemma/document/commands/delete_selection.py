@@ -28,16 +28,18 @@ class Command():
 
         first_node = document.cursor.get_first_node()
         last_node = document.cursor.get_last_node()
-        self.state['deleted_nodes'] = document.ast.delete_range(first_node, last_node)
+        self.state['deleted_runs'] = document.ast.get_node_runs(document.ast.delete_range(first_node, last_node))
         document.cursor.set_insert_selection_nodes(last_node, last_node)
+        document.change_set.add_node(last_node)
 
-        self.is_undo_checkpoint = (len(self.state['deleted_nodes']) > 0)
+        self.is_undo_checkpoint = (len(self.state['deleted_runs']) > 0)
         document.set_scroll_insert_on_screen_after_layout_update()
 
     def undo(self, document):
         insert = document.cursor.get_insert_node()
-        for node in self.state['deleted_nodes']:
-            insert.parent.insert_before(insert, node)
+        document.ast.insert_nodes_before(insert, document.ast.get_nodes_from_runs(self.state['deleted_runs']))
+        if len(self.state['deleted_runs']) > 0:
+            document.change_set.add_node(insert)
 
         document.cursor.set_state(self.state['cursor_state_before'])
         document.set_scroll_insert_on_screen_after_layout_update()
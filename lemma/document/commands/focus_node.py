@@ -20,6 +20,7 @@ class Command():
 
     def __init__(self, node):
         self.node = node
+        self.position = None
         self.is_undo_checkpoint = False
         self.update_implicit_x_position = True
         self.state = dict()
@@ -27,9 +28,15 @@ class Command():
     def run(self, document):
         self.state['cursor_state_before'] = document.cursor.get_state()
 
-        next_node = self.node.next_in_parent()
+        # the node may be replaced by undo, so redo has to work from its position
+        if self.node != None:
+            self.position = self.node.get_position_tuple()
+            self.node = None
+        node = document.ast.get_node_at_position(self.position)
+
+        next_node = node.next_in_parent()
         if next_node != None:
-            document.cursor.set_insert_node(self.node)
+            document.cursor.set_insert_node(node)
             document.cursor.set_selection_node(next_node)
             document.set_scroll_insert_on_screen_after_layout_update()
 
@@ -29,7 +29,7 @@ class Command():
 
     def run(self, document):
         self.state['cursor_state_before'] = document.cursor.get_state()
-        self.state['nodes_added'] = []
+        nodes_added = []
 
         insert = document.cursor.get_insert_node()
         if insert.parent.is_root():
@@ -37,15 +37,21 @@ class Command():
             node = Node('image', image)
             node.paragraph_style = insert.paragraph_style
             insert.parent.insert_before(insert, node)
-            self.state['nodes_added'].append(node)
+            nodes_added.append(node)
 
-        self.is_undo_checkpoint = (len(self.state['nodes_added']) > 0)
+        self.state['number_of_nodes_added'] = len(nodes_added)
+        if len(nodes_added) > 0:
+            self.state['first_position'] = nodes_added[0].get_position_tuple()
+            document.change_set.add_node(document.cursor.get_insert_node())
+        self.is_undo_checkpoint = (len(nodes_added) > 0)
         document.set_scroll_insert_on_screen_after_layout_update()
 
     def undo(self, document):
-        for node in self.state['nodes_added']:
-            document.ast.delete_node(node)
+        if self.state['number_of_nodes_added'] > 0:
+            document.ast.delete_nodes_at(self.state['first_position'], self.state['number_of_nodes_added'])
         document.cursor.set_state(self.state['cursor_state_before'])
+        if self.state['number_of_nodes_added'] > 0:
+            document.change_set.add_node(document.cursor.get_insert_node())
         document.set_scroll_insert_on_screen_after_layout_update()
 
 
@@ -15,7 +15,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>
 
-from lemma.document.ast.node import Node
+from lemma.document.ast.style import Style
 
 
 class Command():
@@ -24,26 +24,39 @@ class Command():
         self.is_undo_checkpoint = True
         self.update_implicit_x_position = True
         self.subtree = subtree
+        self.subtree_type = None
+        self.subtree_runs = None
         self.state = dict()
 
     def run(self, document):
         self.state['cursor_state_before'] = document.cursor.get_state()
-        self.state['nodes_added'] = []
-
-        if document.cursor.get_insert_node().parent.type == self.subtree.type:
-            for node in self.subtree:
-                insert = document.cursor.get_insert_node()
-                node.paragraph_style = insert.paragraph_style
-                insert.parent.insert_before(insert, node)
-                self.state['nodes_added'].append(node)
-
-        self.is_undo_checkpoint = (len(self.state['nodes_added']) > 0)
+        nodes_added = []
+
+        # keep runs instead of the subtree, each run creates new nodes from them
+        if self.subtree != None:
+            self.subtree_type = self.subtree.type
+            self.subtree_runs = document.ast.get_node_runs(self.subtree)
+            self.subtree = None
+
+        insert = document.cursor.get_insert_node()
+        if insert.parent.type == self.subtree_type:
+            runs = [(node_type, values, Style.get(style.tags, insert.paragraph_style), link) for node_type, values, style, link in self.subtree_runs]
+            nodes_added = document.ast.get_nodes_from_runs(runs)
+            document.ast.insert_nodes_before(insert, nodes_added)
+
+        self.state['number_of_nodes_added'] = len(nodes_added)
+        if len(nodes_added) > 0:
+            self.state['first_position'] = nodes_added[0].get_position_tuple()
+            document.change_set.add_node(document.cursor.get_insert_node())
+        self.is_undo_checkpoint = (len(nodes_added) > 0)
         document.set_scroll_insert_on_screen_after_layout_update()
 
     def undo(self, document):
-        for node in self.state['nodes_added']:
-            document.ast.delete_node(node)
+        if self.state['number_of_nodes_added'] > 0:
+            document.ast.delete_nodes_at(self.state['first_position'], self.state['number_of_nodes_added'])
         document.cursor.set_state(self.state['cursor_state_before'])
+        if self.state['number_of_nodes_added'] > 0:
+            document.change_set.add_node(document.cursor.get_insert_node())
         document.set_scroll_insert_on_screen_after_layout_update()
 
 
@@ -17,6 +17,7 @@
 
 from lemma.document.ast.node import Node
 from lemma.document.ast.link import Link
+from lemma.document.ast.style import Style
 
 
 class Command():
@@ -31,27 +32,42 @@ class Command():
 
     def run(self, document):
         self.state['cursor_state_before'] = document.cursor.get_state()
-        self.state['nodes_added'] = []
+        nodes_added = []
 
         insert = document.cursor.get_insert_node()
-        paragraph_style_at_cursor = insert.paragraph_style
+        style = Style.get(self.tags, insert.paragraph_style)
+        link = self.get_link(insert)
 
         for char in self.text:
             character = Node('char', char)
-            character.tags = self.tags.copy()
-            character.paragraph_style = paragraph_style_at_cursor
-            if self.link_target != None:
-                character.link = Link(self.link_target)
-            insert.parent.insert_before(insert, character)
-            self.state['nodes_added'].append(character)
-
-        self.is_undo_checkpoint = (len(self.state['nodes_added']) > 0 or len(self.state['deleted_nodes']) > 0 )
+            character.style = style
+            character.link = link
+            nodes_added.append(character)
+        document.ast.insert_nodes_before(insert, nodes_added)
+
+        self.state['number_of_nodes_added'] = len(nodes_added)
+        if len(nodes_added) > 0:
+            self.state['first_position'] = nodes_added[0].get_position_tuple()
+            document.change_set.add_node(document.cursor.get_insert_node())
+        self.is_undo_checkpoint = (len(nodes_added) > 0)
         document.set_scroll_insert_on_screen_after_layout_update()
 
+    def get_link(self, insert):
+        ''' Text typed into a link joins its span. '''
+
+        if self.link_target == None: return None
+
+        for node in [insert.prev_sibling, insert]:
+            if node != None and node.link != None and node.link.target == self.link_target:
+                return node.link
+        return Link(self.link_target)
+
     def undo(self, document):
-        for node in self.state['nodes_added']:
-            document.ast.delete_node(node)
+        if self.state['number_of_nodes_added'] > 0:
+            document.ast.delete_nodes_at(self.state['first_position'], self.state['number_of_nodes_added'])
         document.cursor.set_state(self.state['cursor_state_before'])
+        if self.state['number_of_nodes_added'] > 0:
+            document.change_set.add_node(document.cursor.get_insert_node())
         document.set_scroll_insert_on_screen_after_layout_update()
 
 
@@ -21,6 +21,7 @@ from html.parser import HTMLParser
 from lemma.document.ast.node import Node
 from lemma.document.widgets.image import Image
 from lemma.document.ast.link import Link
+from lemma.document.ast.style import Style
 from lemma.infrastructure.layout_info import LayoutInfo
 
 
@@ -36,7 +37,7 @@ class Command(HTMLParser):
 
         self.open_tags = list()
         self.tags = set()
-        self.link_target = None
+        self.link = None
         self.paragraph_style = 'p'
         self.document = None
         self.composite = None
@@ -55,6 +56,7 @@ class Command(HTMLParser):
             self.feed(body)
 
         self.document.ast.root = self.composite
+        self.document.change_set.add_everything()
         self.document = None
         self.composite = None
 
@@ -74,7 +76,7 @@ class Command(HTMLParser):
         if tag == 'a':
             for name, value in attrs:
                 if name == 'href':
-                    self.link_target = urllib.parse.unquote_plus(value)
+                    self.link = Link(urllib.parse.unquote_plus(value))
         if tag in ['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
             self.paragraph_style = tag
         if tag == 'img':
@@ -102,7 +104,7 @@ class Command(HTMLParser):
 
         if tag == 'strong': self.tags.remove('bold')
         if tag == 'em': self.tags.remove('italic')
-        if tag == 'a': self.link_target = None
+        if tag == 'a': self.link = None
 
     def handle_data(self, data):
         if 'title' in self.open_tags:
@@ -113,13 +115,12 @@ class Command(HTMLParser):
                 self.composite.append(Node('mathsymbol', char))
 
         else:
+            style = Style.get(self.tags, self.paragraph_style)
             for char in data:
                 if char != '\n':
                     node = Node('char', char)
-                    node.tags = self.tags.copy()
-                    node.paragraph_style = self.paragraph_style
-                    if self.link_target != None:
-                        node.link = Link(self.link_target)
+                    node.style = style
+                    node.link = self.link
                     self.composite.append(node)
 
     def undo(self, document):
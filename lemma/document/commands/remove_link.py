@@ -30,17 +30,19 @@ class Command():
         self.state['cursor_state_before'] = document.cursor.get_state()
 
         char_nodes = [node for node in document.ast.get_subtree(*self.bounds) if node.is_char()]
-        prev_links = []
-        for node in char_nodes:
-            prev_links.append(node.link)
-            node.link = None
-        self.state['nodes_and_prev_links'] = list(zip(char_nodes, prev_links))
+        self.state['link_runs'] = document.ast.get_link_runs(char_nodes)
+        for first_position, last_position, prev_link in self.state['link_runs']:
+            document.ast.set_link(first_position, last_position, None)
+        if len(char_nodes) > 0:
+            document.change_set.add_range(char_nodes[0], char_nodes[-1])
 
     def undo(self, document):
         document.cursor.set_state(self.state['cursor_state_before'])
 
-        for item in self.state['nodes_and_prev_links']:
-            item[0].link = item[1]
+        for first_position, last_position, prev_link in self.state['link_runs']:
+            document.ast.set_link(first_position, last_position, prev_link)
+        if len(self.state['link_runs']) > 0:
+            document.change_set.add_range(document.ast.get_node_at_position(self.state['link_runs'][0][0]), document.ast.get_node_at_position(self.state['link_runs'][-1][1]))
 
         document.set_scroll_insert_on_screen_after_layout_update()
 
@@ -15,6 +15,8 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>
 
+from lemma.document.ast.style import Style
+
 
 class Command():
 
@@ -27,14 +29,20 @@ class Command():
     def run(self, document):
         char_nodes = [node for node in document.ast.get_subtree(*document.cursor.get_state()) if node.is_char()]
 
-        self.state['affected_nodes'] = list()
-        for node in char_nodes:
-            if self.tag_name in node.tags:
-                self.state['affected_nodes'].append(node)
-                node.tags.remove(self.tag_name)
+        self.state['style_runs'] = list()
+        for first_position, last_position, style in document.ast.get_style_runs(char_nodes):
+            if self.tag_name in style.tags:
+                self.state['style_runs'].append((first_position, last_position, style))
+                document.ast.set_style(first_position, last_position, Style.get(style.tags - {self.tag_name}, style.paragraph_style))
+
+        if len(self.state['style_runs']) > 0:
+            document.change_set.add_range(document.ast.get_node_at_position(self.state['style_runs'][0][0]), document.ast.get_node_at_position(self.state['style_runs'][-1][1]))
 
     def undo(self, document):
-        for node in self.state['affected_nodes']:
-            node.tags.add(self.tag_name)
+        for first_position, last_position, style in self.state['style_runs']:
+            document.ast.set_style(first_position, last_position, style)
+
+        if len(self.state['style_runs']) > 0:
+            document.change_set.add_range(document.ast.get_node_at_position(self.state['style_runs'][0][0]), document.ast.get_node_at_position(self.state['style_runs'][-1][1]))
 
 
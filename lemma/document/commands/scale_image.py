@@ -33,13 +33,15 @@ class Command():
         if len(selected_nodes) == 1 and selected_nodes[0].type == 'image':
             image = selected_nodes[0].value
             self.state['width_before'] = image.get_width()
-            self.state['image'] = image
+            self.state['position'] = selected_nodes[0].get_position_tuple()
             image.set_width(self.width)
+            document.change_set.add_node(selected_nodes[0])
             self.is_undo_checkpoint = True
 
     def undo(self, document):
         if self.state['width_before'] != None:
-            image = self.state['image']
-            image.set_width(self.state['width_before'])
+            node = document.ast.get_node_at_position(self.state['position'])
+            node.value.set_width(self.state['width_before'])
+            document.change_set.add_node(node)
 
 
@@ -15,8 +15,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>
 
-from lemma.document.ast.node import Node
-from lemma.document.ast.link import Link
+from lemma.document.ast.style import Style
 
 
 class Command():
@@ -28,18 +27,18 @@ class Command():
         self.state = dict()
 
     def run(self, document):
-        self.state['nodes_and_previous_paragraph_style'] = []
-
         first_node = document.cursor.get_first_node().line_start()
         last_node = document.cursor.get_last_node().line_end()
-        for node in document.ast.get_subtree(first_node.get_position(), last_node.get_position()):
-            self.state['nodes_and_previous_paragraph_style'].append([node, node.paragraph_style])
-            node.paragraph_style = self.paragraph_style
-        self.state['nodes_and_previous_paragraph_style'].append([last_node, last_node.paragraph_style])
-        last_node.paragraph_style = self.paragraph_style
+        nodes = list(document.ast.get_subtree(first_node.get_position(), last_node.get_position())) + [last_node]
+
+        self.state['style_runs'] = document.ast.get_style_runs(nodes)
+        for first_position, last_position, style in self.state['style_runs']:
+            document.ast.set_style(first_position, last_position, Style.get(style.tags, self.paragraph_style))
+        document.change_set.add_range(first_node, last_node)
 
     def undo(self, document):
-        for node, paragraph_style in self.state['nodes_and_previous_paragraph_style']:
-            node.paragraph_style = paragraph_style
+        for first_position, last_position, style in self.state['style_runs']:
+            document.ast.set_style(first_position, last_position, style)
+        document.change_set.add_range(document.ast.get_node_at_position(self.state['style_runs'][0][0]), document.ast.get_node_at_position(self.state['style_runs'][-1][1]))
 
 
@@ -19,6 +19,7 @@ import time, os.path, datetime
 
 from lemma.document.ast.ast import AST
 from lemma.document.ast.cursor import Cursor
+from lemma.document.ast.change_set import ChangeSet
 from lemma.document.housekeeper.housekeeper import Housekeeper
 from lemma.document.layouter.layouter import Layouter
 from lemma.document.clipping.clipping import Clipping
@@ -26,6 +27,7 @@ from lemma.document.html_scanner.html_scanner import HTMLScanner
 from lemma.document.plaintext_scanner.plaintext_scanner import PlaintextScanner
 from lemma.document.command_processor.command_processor import CommandProcessor
 from lemma.infrastructure.service_locator import ServiceLocator
+from lemma.infrastructure.profiler import Profiler
 from lemma.helpers.observable import Observable
 for (path, directories, files) in os.walk(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'commands')):
     for file in files:
@@ -43,15 +45,23 @@ class Document(Observable):
         self.command_processor = CommandProcessor(self)
 
         self.id = id
+        self.filename = None
+        self.is_loaded = True
         self.title = ''
         self.ast = AST()
         self.cursor = Cursor(self.ast, self.ast.root[0], self.ast.root[0])
+        self.change_set = ChangeSet()
+        self.change_set.add_everything()
         self.implicit_x_position = 0
         self.scroll_insert_on_screen_after_layout_update = False
+        self.paragraphs = []
         self.layout = None
-        self.html = None
-        self.plaintext = None
+        self.html_string = None
+        self.plaintext_string = None
         self.links = []
+        self.images = []
+        self.transaction_depth = 0
+        self.unpublished_change_code = None
 
         self.housekeeper = Housekeeper(self)
         self.layouter = Layouter(self)
@@ -59,6 +69,19 @@ class Document(Observable):
         self.html_scanner = HTMLScanner(self)
         self.plaintext_scanner = PlaintextScanner(self)
 
+    def defer_loading(self, filename):
+        self.filename = filename
+        self.is_loaded = False
+
+    def load(self):
+        if self.is_loaded: return
+        self.is_loaded = True
+
+        with open(self.filename, 'r') as file:
+            html = file.read()
+        self.add_command('populate_from_html', html, os.path.dirname(self.filename))
+        self.command_processor.reset_undo_stack()
+
     def add_command(self, name, *parameters):
         command = eval(name + '.Command')(*parameters)
         self.command_processor.add_command(command)
@@ -74,15 +97,88 @@ class Document(Observable):
     def undo(self): self.command_processor.undo()
     def redo(self): self.command_processor.redo()
 
+    def begin_transaction(self):
+        self.transaction_depth += 1
+
+    def end_transaction(self):
+        if self.transaction_depth == 0: return
+
+        self.transaction_depth -= 1
+        if self.transaction_depth == 0 and self.unpublished_change_code != None:
+            self.publish()
+
     def update(self):
+        if self.change_set.is_empty():
+            self.update_view()
+            return
+
+        start_time = Profiler.get_time()
         self.housekeeper.update()
+        Profiler.add_time('housekeeper', start_time, self.id)
+        self.html_string = None
+        self.plaintext_string = None
+
+        start_time = Profiler.get_time()
         self.layouter.update()
-        self.clipping.update()
-        self.html_scanner.update()
-        self.plaintext_scanner.update()
+        Profiler.add_time('layouter', start_time, self.id)
+
         self.update_implicit_x_position()
 
-        self.add_change_code('changed')
+        self.unpublished_change_code = 'changed'
+        if self.transaction_depth == 0:
+            self.publish()
+
+    def update_view(self):
+        ''' Commands which only moved the cursor or scrolled leave
+            layout, html and plaintext as they are. '''
+
+        self.update_implicit_x_position()
+
+        if self.unpublished_change_code == None:
+            self.unpublished_change_code = 'view_changed'
+        if self.transaction_depth == 0:
+            self.publish()
+
+    def publish(self):
+        ''' Inside a transaction, commands keep ast and layout up to date
+            for the commands following them. Notifying observers waits
+            until the transaction ends. '''
+
+        change_code = self.unpublished_change_code
+        self.unpublished_change_code = None
+
+        self.clipping.update()
+        self.add_change_code(change_code)
+
+    @property
+    def html(self):
+        ''' Built from the paragraphs when first asked for after a change. '''
+
+        if self.html_string == None:
+            start_time = Profiler.get_time()
+            self.html_string = self.html_scanner.get_html()
+            Profiler.add_time('html_scanner', start_time, self.id)
+        return self.html_string
+
+    @property
+    def plaintext(self):
+        if self.plaintext_string == None:
+            start_time = Profiler.get_time()
+            self.plaintext_string = self.plaintext_scanner.get_plaintext()
+            Profiler.add_time('plaintext_scanner', start_time, self.id)
+        return self.plaintext_string
+
+    @plaintext.setter
+    def plaintext(self, plaintext):
+        self.plaintext_string = plaintext
+
+    def get_plaintext_start(self, length):
+        ''' At least the first length chars of the plaintext, if there are
+            as many, without building all of it. '''
+
+        if self.plaintext_string != None:
+            return self.plaintext_string[:length]
+        return self.plaintext_scanner.get_plaintext_start(length)
 
     def update_last_modified(self):
         self.last_modified = time.time()
@@ -95,7 +191,8 @@ class Document(Observable):
 
     def set_title(self, title):
         self.title = title
-        self.html_scanner.update()
+        self.housekeeper.update()
+        self.html_string = None
 
         self.update_last_modified()
         self.add_change_code('changed')
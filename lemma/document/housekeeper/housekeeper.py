@@ -15,26 +15,143 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>
 
+from lemma.document.ast.paragraph import Paragraph
+
 
 class Housekeeper():
 
     def __init__(self, document):
         self.document = document
-        self.links = []
+        self.root = None
+        self.paragraphs = []
+
+        # links and images of all paragraphs by id, with the number of paragraph runs holding them
+        self.links = dict()
+        self.images = dict()
+        self.counts = dict()
 
     def update(self):
-        self.links = []
+        change_set = self.document.change_set
+        if self.document.ast.root != self.root or change_set.includes_everything or len(self.paragraphs) == 0:
+            self.root = self.document.ast.root
+            self.paragraphs = []
+            self.links, self.images, self.counts = dict(), dict(), dict()
+            self.replace_paragraphs(0, 0, self.get_paragraphs(0, len(self.root)))
+        else:
+            self.splice_paragraphs(change_set.paragraph_ends)
+        change_set.reset()
+
+        self.document.paragraphs = self.paragraphs
+        self.document.links = self.links.values()
+        self.document.images = self.images.values()
+
+    def splice_paragraphs(self, dirty_ends):
+        ''' Replace the paragraphs around each changed paragraph end with
+            the paragraphs now found in their place. They are found by
+            binary search over the root index, so the cost follows the
+            size of the change, not of the document. '''
+
+        ranges = []
+        for node in dirty_ends:
+            if node.parent != self.root: continue
+
+            end = self.find_paragraph(self.root.index(node))
+            if end == len(self.paragraphs): end -= 1
+            start = end
+            while start > 0 and not self.is_valid(self.paragraphs[start - 1]):
+                start -= 1
+            ranges.append((start, end))
+
+        merged_ranges = []
+        for start, end in sorted(ranges):
+            if len(merged_ranges) > 0 and start <= merged_ranges[-1][1] + 1:
+                merged_ranges[-1] = (merged_ranges[-1][0], max(end, merged_ranges[-1][1]))
+            else:
+                merged_ranges.append((start, end))
+
+        for start, end in reversed(merged_ranges):
+            root_start = self.root.index(self.paragraphs[start - 1].get_last_node()) + 1 if start > 0 else 0
+            if self.paragraphs[end].get_last_node().parent == self.root:
+                root_end = self.root.index(self.paragraphs[end].get_last_node()) + 1
+            else:
+                root_end = len(self.root)
+            self.replace_paragraphs(start, end + 1, self.get_paragraphs(root_start, root_end))
+
+    def find_paragraph(self, index):
+        ''' The first paragraph still ending in the tree at or after
+            index. Paragraphs whose last node was removed only occur next
+            to changes, the search steps over them. '''
+
+        low, high = 0, len(self.paragraphs)
+        while low < high:
+            middle = (low + high) // 2
+            probe = self.skip_removed(middle, high)
+            if probe < high and self.root.index(self.paragraphs[probe].get_last_node()) < index:
+                low = probe + 1
+            else:
+                high = middle
+        return self.skip_removed(low, len(self.paragraphs))
+
+    def skip_removed(self, index, end):
+        while index < end and self.paragraphs[index].get_last_node().parent != self.root:
+            index += 1
+        return index
+
+    def is_valid(self, paragraph):
+        if paragraph.get_last_node().parent != self.root: return False
+        if paragraph.get_first_node().parent != self.root: return False
+        return True
+
+    def replace_paragraphs(self, start, end, paragraphs):
+        for paragraph in self.paragraphs[start:end]:
+            self.count_references(paragraph.links, self.links, -1)
+            self.count_references(paragraph.images, self.images, -1)
+
+        for paragraph in paragraphs:
+            self.process_paragraph(paragraph)
+            self.count_references(paragraph.links, self.links, 1)
+            self.count_references(paragraph.images, self.images, 1)
+
+        self.paragraphs[start:end] = paragraphs
+
+    def count_references(self, values, values_by_id, delta):
+        for value in values:
+            key = id(value)
+            count = self.counts.get(key, 0) + delta
+            if count == 0:
+                del(self.counts[key])
+                del(values_by_id[key])
+            else:
+                self.counts[key] = count
+                values_by_id[key] = value
+
+    def get_paragraphs(self, start, end):
+        paragraphs = []
+        nodes = []
+        for node in self.root.children[start:end]:
+            nodes.append(node)
+            if node.is_eol():
+                paragraphs.append(Paragraph(nodes))
+                nodes = []
+        if len(nodes) > 0:
+            paragraphs.append(Paragraph(nodes))
+
+        return paragraphs
 
-        for child in self.document.ast.root:
-            self.process_node(child)
+    def process_paragraph(self, paragraph):
+        paragraph.links = []
+        paragraph.images = []
 
-        self.document.links = self.links
+        for node in paragraph.nodes:
+            self.process_node(paragraph, node)
 
-    def process_node(self, node):
-        if node.link != None:
-            self.links.append(node.link)
+    def process_node(self, paragraph, node):
+        if node.link != None and (len(paragraph.links) == 0 or node.link is not paragraph.links[-1]):
+            paragraph.links.append(node.link)
+        if node.type == 'image':
+            paragraph.images.append(node.value)
 
         for child in node:
-            self.process_node(child)
+            self.process_node(paragraph, child)
 
 
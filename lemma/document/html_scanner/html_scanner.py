@@ -16,25 +16,19 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>
 
 import urllib.parse
-import os, os.path
-
-from lemma.infrastructure.service_locator import ServiceLocator
 
 
 class HTMLScanner(object):
 
     def __init__(self, document):
         self.document = document
-        self.pathname = ServiceLocator.get_notes_folder()
 
-        self.file_no = 0
         self.html = ''
 
-    def update(self):
-        data_dir = ServiceLocator.get_notes_folder()
-        for file in [file for file in os.listdir(data_dir) if file.startswith(str(self.document.id) + '-')]:
-            os.remove(os.path.join(data_dir, file))
-        self.file_no = 0
+    def get_html(self):
+        for paragraph in self.document.paragraphs:
+            if paragraph.html == None:
+                self.process_paragraph(paragraph)
 
         self.html = '<html>'
 
@@ -43,37 +37,33 @@ class HTMLScanner(object):
         self.html += '</head>'
 
         self.html += '<body>'
-        lines = self.group_by_line(self.document.ast.root)
-        for line in lines:
+        self.html += ''.join([paragraph.html for paragraph in self.document.paragraphs])
+        self.html += '</body>'
+
+        self.html += '</html>'
+        return self.html
+
+    def process_paragraph(self, paragraph):
+        self.html = ''
+
+        line = paragraph.nodes
+        if line[-1].is_eol():
             node_lists = self.group_by_node_type(line)
 
             self.html += '<' + line[-1].paragraph_style + '>'
             for node_list in node_lists:
                 self.process_list(node_list)
             self.html += '</' + line[-1].paragraph_style + '>\n'
-        self.html += '</body>'
 
-        self.html += '</html>'
-        self.document.html = self.html
-
-    def group_by_line(self, root_node):
-        result = list()
-        result.append(list())
-        for node in root_node:
-            result[-1].append(node)
-            if node.is_eol():
-                result.append(list())
-        result.pop()
-
-        return result
+        paragraph.html = self.html
 
     def group_by_node_type(self, node_list):
         last_type = None
-        last_tags = set()
+        last_tags = None
         last_link = None
         result = list()
         for node in node_list:
-            if node.type != last_type or node.tags.symmetric_difference(last_tags) or node.link != last_link:
+            if node.type != last_type or node.tags is not last_tags or node.link != last_link:
                 result.append(list())
                 last_type = node.type
                 last_tags = node.tags
@@ -114,9 +104,6 @@ class HTMLScanner(object):
         elif node.type in ['char', 'mathsymbol']:
             self.html += node.value
         elif node.type == 'image':
-            filename = str(self.document.id) + '-' + str(self.file_no) + node.value.get_file_ending()
-            node.value.save_as(os.path.join(self.pathname, filename))
-            self.file_no += 1
-            self.html += '<img src="' + filename + '" width="' + str(node.value.get_width()) + '" />'
+            self.html += '<img src="' + node.value.get_name() + '" width="' + str(node.value.get_width()) + '" />'
 
 
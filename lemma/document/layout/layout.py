@@ -15,6 +15,8 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>
 
+import bisect
+
 
 class Box(object):
 
@@ -25,6 +27,10 @@ class Box(object):
         self.left = left
         self.top = top
 
+        # offset inside the parent, kept up to date by the parent
+        self.x = 0
+        self.y = 0
+
         self.parent = None
         self.children = list()
 
@@ -32,6 +38,9 @@ class Box(object):
         self.node = node
 
     def add(self, child):
+        if self.is_vertical(): child.x, child.y = 0, self.height
+        else: child.x, child.y = self.width, 0
+
         self.children.append(child)
         child.set_parent(self)
         self.update_size(child)
@@ -40,6 +49,23 @@ class Box(object):
         self.children.insert(position, child)
         child.set_parent(self)
         self.update_size(child)
+        self.update_offsets(position)
+
+    def update_offsets(self, start=0):
+        ''' Recompute the offsets of the children from start on. '''
+
+        if start > 0:
+            previous = self.children[start - 1]
+            x, y = previous.x, previous.y
+            if self.is_vertical(): y += previous.height
+            else: x += previous.width
+        else:
+            x, y = 0, 0
+
+        for child in self.children[start:]:
+            child.x, child.y = x, y
+            if self.is_vertical(): y += child.height
+            else: x += child.width
 
     def update_size(self, new_child):
         if self.is_vertical():
@@ -50,17 +76,30 @@ class Box(object):
             self.width += new_child.width
 
     def get_xy_at_child(self, box):
-        x = 0
-        y = 0
-        for child in self.children:
-            if child == box:
-                break
-            if self.is_vertical():
-                y += child.height
-            else:
-                x += child.width
+        return (box.x, box.y)
+
+    def get_xy(self):
+        x, y = 0, 0
+        box = self
+        while box.parent != None:
+            x += box.x
+            y += box.y
+            box = box.parent
         return (x, y)
 
+    def check_offsets(self):
+        ''' Debugging aid, raises an AssertionError if any cached offset
+            below this box differs from the sum of its predecessors. '''
+
+        x, y = 0, 0
+        for index, child in enumerate(self.children):
+            assert child.parent == self, 'child {} of {} has parent {}'.format(index, self.type, child.parent)
+            assert (child.x, child.y) == (x, y), 'child {} of {} at {}, expected {}'.format(index, self.type, (child.x, child.y), (x, y))
+
+            if self.is_vertical(): y += child.height
+            else: x += child.width
+            child.check_offsets()
+
     def get_node_at_xy(self, x, y):
         x = max(0, min(self.width, x))
         if y > self.height: x = self.width
@@ -103,29 +142,34 @@ class Box(object):
             return self
 
     def get_child_at_xy(self, x, y):
-        if self.is_vertical():
-            current_child, current_height = (None, 0)
+        ''' Binary search over the cached offsets. Returns the first child
+            reaching beyond the point (or starting right at it, along a
+            line), the last one if there is none. '''
+
+        if len(self.children) == 0: return (None, 0, 0)
+        last_child = self.children[-1]
 
-            for child in self.children:
-                current_child = child
-                if current_height + child.height <= y:
-                    current_height += child.height
-                else:
-                    break
-            return (current_child, 0, current_height)
+        if self.is_vertical():
+            index = bisect.bisect_right(self.children, y, key=lambda child: child.y + child.height)
+            if index < len(self.children):
+                return (self.children[index], 0, self.children[index].y)
+            return (last_child, 0, last_child.y + last_child.height)
 
         else:
-            current_child, current_width = (None, 0)
-
-            for child in self.children:
-                current_child = child
-                if current_width == x:
-                    break
-                elif current_width + child.width <= x:
-                    current_width += child.width
-                else:
-                    break
-            return (current_child, current_width, 0)
+            index = bisect.bisect_right(self.children, x, key=lambda child: child.x + child.width)
+            index_at_x = bisect.bisect_left(self.children, x, key=lambda child: child.x)
+            if index_at_x < len(self.children) and self.children[index_at_x].x == x:
+                index = min(index, index_at_x)
+            if index < len(self.children):
+                return (self.children[index], self.children[index].x, 0)
+            return (last_child, last_child.x + last_child.width, 0)
+
+    def get_children_in_range(self, start, end):
+        ''' Children of a vertical box overlapping start <= y < end. '''
+
+        first = bisect.bisect_right(self.children, start, key=lambda child: child.y + child.height)
+        last = bisect.bisect_left(self.children, end, key=lambda child: child.y)
+        return self.children[first:last]
 
     def set_parent(self, parent): self.parent = parent
     def is_vertical(self): return self.type == 'vcontainer'
@@ -15,6 +15,8 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>
 
+import os
+
 from lemma.infrastructure.font_manager import FontManager
 from lemma.infrastructure.layout_info import LayoutInfo
 from lemma.document.layout.layout import Box
@@ -27,36 +29,156 @@ class Layouter(object):
         self.document = document
 
         self.root = Box('vcontainer', width=0, height=0)
+        self.lines = []
         self.current_line_box = Box('hcontainer', width=0, height=FontManager.get_line_height())
+        self.char_extents = dict()
+
+        # line count, height and width of the layout before each paragraph
+        self.paragraphs = []
+        self.offsets = [(0, 0, 0)]
+
+        # line templates of recently laid out paragraphs, by width and fingerprint
+        self.cache = dict()
+        self.cache_size = 256
 
         self.current_number = []
 
+        # set LEMMA_CHECK_LAYOUT to verify cached box offsets after each update
+        self.check_offsets = 'LEMMA_CHECK_LAYOUT' in os.environ
+
     def update(self):
-        self.root = Box('vcontainer', width=0, height=0)
-        self.current_line_box = Box('hcontainer', width=0, height=FontManager.get_line_height())
+        layout_width = LayoutInfo.get_layout_width()
+        paragraphs = self.document.paragraphs
 
-        node_lists = self.group_by_node_type(self.document.ast.root)
-        for node_list in node_lists:
-            self.process_list(node_list)
+        index = 0
+        while index < min(len(paragraphs), len(self.paragraphs)) and paragraphs[index] == self.paragraphs[index] and paragraphs[index].layout_width == layout_width:
+            index += 1
+
+        self.offsets = self.offsets[:index + 1]
+        line_count, height, width = self.offsets[-1]
+        lines = self.root.children[:line_count]
+
+        for paragraph in paragraphs[index:]:
+            if paragraph.lines == None or paragraph.layout_width != layout_width:
+                self.layout_paragraph(paragraph, layout_width)
+
+            for line in paragraph.lines:
+                line.set_parent(self.root)
+                line.x, line.y = 0, height
+                lines.append(line)
+                height += line.height
+                width = max(width, line.width)
+            self.offsets.append((len(lines), height, width))
+
+        self.root.children = lines
+        self.root.height = height
+        self.root.width = width
+        self.paragraphs = list(paragraphs)
 
         self.document.layout = self.root
+        if self.check_offsets:
+            self.root.check_offsets()
+
+    def layout_paragraph(self, paragraph, layout_width):
+        key = (layout_width, self.get_fingerprint(paragraph.nodes))
+
+        if key in self.cache:
+            template = self.cache.pop(key)
+            self.lines = self.get_lines_from_template(paragraph.nodes, template)
+        else:
+            self.lines = []
+            self.current_line_box = Box('hcontainer', width=0, height=FontManager.get_line_height())
+
+            node_lists = self.group_by_node_type(paragraph.nodes)
+            self.shape_runs(node_lists)
+            for node_list in node_lists:
+                self.process_list(node_list)
+            if len(self.current_line_box.children) > 0:
+                self.break_line()
+            self.char_extents = dict()
+
+            template = self.get_template(self.lines)
+
+        self.cache[key] = template
+        if len(self.cache) > self.cache_size:
+            del(self.cache[next(iter(self.cache))])
+
+        paragraph.lines = self.lines
+        paragraph.layout_width = layout_width
+
+    def get_fingerprint(self, nodes):
+        fingerprint = []
+        for node in nodes:
+            if node.type == 'image':
+                fingerprint.append((node.type, node.value.get_width(), node.value.get_height(), node.paragraph_style))
+            else:
+                fingerprint.append((node.type, node.value, node.style))
+        return tuple(fingerprint)
+
+    def get_template(self, lines):
+        template = []
+        for line in lines:
+            template.append([(box.type, box.width, box.height, box.left, box.top, frozenset(box.classes)) for box in line.children])
+        return template
+
+    def get_lines_from_template(self, nodes, template):
+        lines = []
+        nodes = iter(nodes)
+        for line_template in template:
+            line = Box('hcontainer', width=0, height=FontManager.get_line_height())
+            for box_type, width, height, left, top, classes in line_template:
+                node = next(nodes)
+                box = Box(box_type, width=width, height=height, left=left, top=top, node=node)
+                box.classes.update(classes)
+                node.set_box(box)
+                line.add(box)
+            lines.append(line)
+        return lines
 
     def group_by_node_type(self, root_node):
         last_type = None
-        last_tags = set()
+        last_tags = None
         result = list()
         for node in root_node:
             if node.is_whitespace():
                 result.append(list())
                 last_type = None
-                last_tags = set()
-            elif node.type != last_type or node.tags.symmetric_difference(last_tags):
+                last_tags = None
+            elif node.type != last_type or node.tags is not last_tags:
                 result.append(list())
                 last_type = node.type
                 last_tags = node.tags
             result[-1].append(node)
         return result
 
+    def shape_runs(self, node_lists):
+        ''' Shape consecutive words sharing a font in a single call,
+            including the spaces between them. '''
+
+        runs = []
+        fontname = None
+        for node_list in node_lists:
+            if node_list[0].type == 'char' and not node_list[0].is_whitespace():
+                if self.get_fontname(node_list[0]) != fontname:
+                    fontname = self.get_fontname(node_list[0])
+                    runs.append((fontname, []))
+                runs[-1][1].extend(node_list)
+            elif node_list[0].type == 'char' and fontname != None:
+                runs[-1][1].extend(node_list)
+            else:
+                fontname = None
+
+        for fontname, nodes in runs:
+            text = ''.join([node.value for node in nodes])
+            self.char_extents.update(zip(nodes, FontManager.get_char_extents_multi(text, fontname=fontname)))
+
+    def get_fontname(self, node):
+        if node.paragraph_style.startswith('h'): return node.paragraph_style
+        elif 'bold' in node.tags and 'italic' not in node.tags: return 'bold'
+        elif 'bold' in node.tags and 'italic' in node.tags: return 'bolditalic'
+        elif 'bold' not in node.tags and 'italic' in node.tags: return 'italic'
+        else: return 'book'
+
     def process_list(self, node_list):
         if node_list[0].type == 'char' and not node_list[0].is_whitespace():
             self.process_word(node_list)
@@ -67,22 +189,11 @@ class Layouter(object):
     def process_word(self, node_list):
         if len(node_list) == 0: return
 
-        text = ''
-        for char in node_list:
-            text += char.value
-
         total_width = 0
         char_boxes = []
 
-        node = node_list[0]
-        if node.paragraph_style.startswith('h'): fontname = node.paragraph_style
-        elif 'bold' in node.tags and 'italic' not in node.tags: fontname = 'bold'
-        elif 'bold' in node.tags and 'italic' in node.tags: fontname = 'bolditalic'
-        elif 'bold' not in node.tags and 'italic' in node.tags: fontname = 'italic'
-        else: fontname = 'book'
-
-        for node, extents in zip(node_list, FontManager.get_char_extents_multi(text, fontname=fontname)):
-            width, height, left, top = extents
+        for node in node_list:
+            width, height, left, top = self.char_extents[node]
             top -= FontManager.get_cursor_offset()
             total_width += width
             box = Box('glyph', width=width, height=height, left=left, top=top, node=node)
@@ -144,7 +255,7 @@ class Layouter(object):
         self.current_line_box.add(box)
 
     def break_line(self):
-        self.root.add(self.current_line_box)
+        self.lines.append(self.current_line_box)
         self.current_line_box = Box('hcontainer', width=0, height=FontManager.get_line_height())
 
 
@@ -23,13 +23,30 @@ class PlaintextScanner(object):
 
         self.text = ''
 
-    def update(self):
+    def get_plaintext(self):
+        for paragraph in self.document.paragraphs:
+            if paragraph.plaintext == None:
+                self.process_paragraph(paragraph)
+
+        return ''.join([paragraph.plaintext for paragraph in self.document.paragraphs])
+
+    def get_plaintext_start(self, length):
+        text = ''
+        for paragraph in self.document.paragraphs:
+            if len(text) >= length: break
+            if paragraph.plaintext == None:
+                self.process_paragraph(paragraph)
+            text += paragraph.plaintext
+
+        return text
+
+    def process_paragraph(self, paragraph):
         self.text = ''
 
-        for child in self.document.ast.root:
+        for child in paragraph.nodes:
             self.process_node(child)
 
-        self.document.plaintext = self.text
+        paragraph.plaintext = self.text
 
     def process_node(self, node):
         if node.is_eol():
@@ -15,11 +15,12 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>
 
-import os.path
+import os.path, io
 from PIL import Image as PIL_Image
 import cairo
 
 from lemma.infrastructure.layout_info import LayoutInfo
+from lemma.infrastructure.image_store import ImageStore
 from lemma.db.file_format_db import FileFormatDB
 
 
@@ -27,6 +28,7 @@ class Image(object):
 
     def __init__(self, filename, width=None):
         self.pil_image = PIL_Image.open(filename)
+        self.name = ImageStore.add_file(filename, self.get_file_ending())
         self.cairo_surface = None
 
         if width != None:
@@ -63,15 +65,26 @@ class Image(object):
     def get_cairo_surface(self):
         return self.cairo_surface
 
-    def save_as(self, filename):
-        self.pil_image.save(filename)
+    def get_name(self):
+        return self.name
+
+    def get_size(self):
+        ''' Roughly the memory held by the pixel data, in bytes. '''
+
+        original_size = self.pil_image.width * self.pil_image.height * len(self.pil_image.getbands())
+        return original_size + self.cairo_surface.get_stride() * self.get_height()
 
     # make this pickle
     def __getstate__(self):
-        return {'pil_image': self.pil_image, 'width': self.get_width()}
+        return {'pil_image': self.pil_image, 'name': self.name, 'width': self.get_width()}
 
     def __setstate__(self, state):
         self.pil_image = state['pil_image']
+        self.name = state['name']
+        if not ImageStore.contains(self.name):
+            data = io.BytesIO()
+            self.pil_image.save(data, format=self.pil_image.format)
+            self.name = ImageStore.add_data(data.getvalue(), self.get_file_ending())
         self.set_width(state['width'])
 
 
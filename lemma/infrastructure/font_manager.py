@@ -15,6 +15,8 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>
 
+import cairo
+
 import lib.freetype2.freetype2 as freetype2
 import lib.harfpy.harfbuzz as harfbuzz
 import lib.fontconfig.fontconfig as fontconfig
@@ -23,6 +25,15 @@ import lib.fontconfig.fontconfig as fontconfig
 class FontManager():
 
     fonts = dict()
+    features = ((b'liga', 0), (b'kern', 1))
+
+    # shaped words by (text, fontname, features), least recently used first
+    shaping_cache = dict()
+    shaping_cache_length = 0
+    shaping_cache_max_length = 100000
+    shaping_cache_max_word_length = 1000
+    shaping_cache_hits = 0
+    shaping_cache_misses = 0
 
     def add_font(name, filename, size, line_height, ascend, descend):
         fontconfig.Config.get_current().app_font_add_file(filename)
@@ -45,7 +56,10 @@ class FontManager():
         FontManager.fonts[name]['line_space'] = (line_height - ascend - descend) / 2
         FontManager.fonts[name]['harfbuzz_font'] = harfbuzz.Font.ft_create(face)
         FontManager.fonts[name]['char_extents'] = dict()
-        FontManager.fonts[name]['surface_cache'] = dict()
+        FontManager.fonts[name]['atlas'] = None
+        FontManager.fonts[name]['atlas_rectangles'] = dict()
+        FontManager.fonts[name]['atlas_shelf'] = (0, 0, 0)
+        FontManager.clear_shaping_cache()
 
     def get_line_height(fontname='book'):
         return FontManager.fonts[fontname]['line_height']
@@ -84,28 +98,114 @@ class FontManager():
         return FontManager.fonts[fontname]['char_extents'][char]
  
     def get_char_extents_multi(text, fontname='book'):
+        ''' Returns (width, height, left, top) for every char of text.
+            Words are cached one by one. Consecutive words missing from
+            the cache get shaped in a single call, whitespace keeps its
+            unshaped extents. '''
+
+        result = []
+        missing_start = None
+        for start, end in FontManager.get_word_boundaries(text):
+            if text[start].isspace():
+                for char in text[start:end]:
+                    result.append(FontManager.get_char_extents_single(char, fontname=fontname))
+                continue
+
+            key = (text[start:end], fontname, FontManager.features)
+            if key in FontManager.shaping_cache:
+                if missing_start != None:
+                    FontManager.shape_missing_words(text, missing_start, start, result, fontname)
+                    missing_start = None
+
+                FontManager.shaping_cache_hits += 1
+                extents = FontManager.shaping_cache.pop(key)
+                FontManager.shaping_cache[key] = extents
+                result.extend(extents)
+            else:
+                if missing_start == None:
+                    missing_start = start
+                result.extend([None] * (end - start))
+
+        if missing_start != None:
+            FontManager.shape_missing_words(text, missing_start, len(text), result, fontname)
+
+        return result
+
+    def shape_missing_words(text, start, end, result, fontname='book'):
+        shaped = FontManager.shape(text[start:end], fontname=fontname)
+
+        for word_start, word_end in FontManager.get_word_boundaries(text[start:end]):
+            if text[start + word_start].isspace(): continue
+
+            extents = shaped[word_start:word_end]
+            result[start + word_start:start + word_end] = extents
+            FontManager.add_to_shaping_cache(text[start + word_start:start + word_end], extents, fontname)
+
+    def add_to_shaping_cache(word, extents, fontname='book'):
+        key = (word, fontname, FontManager.features)
+        if key in FontManager.shaping_cache: return
+
+        FontManager.shaping_cache_misses += 1
+        if len(word) > FontManager.shaping_cache_max_word_length: return
+
+        FontManager.shaping_cache[key] = extents
+        FontManager.shaping_cache_length += len(word)
+        while FontManager.shaping_cache_length > FontManager.shaping_cache_max_length:
+            oldest_key = next(iter(FontManager.shaping_cache))
+            FontManager.shaping_cache_length -= len(oldest_key[0])
+            del(FontManager.shaping_cache[oldest_key])
+
+    def get_word_boundaries(text):
+        ''' (start, end) of each maximal stretch of text that is either
+            all whitespace or free of it. '''
+
+        boundaries = []
+        start = 0
+        for i in range(1, len(text) + 1):
+            if i == len(text) or text[i].isspace() != text[start].isspace():
+                boundaries.append((start, i))
+                start = i
+        return boundaries
+
+    def shape(text, fontname='book'):
         harfbuzz_buffer = harfbuzz.Buffer.create()
-        harfbuzz_buffer.add_str(text)
+        harfbuzz_buffer.add_utf32(text)
         harfbuzz_buffer.guess_segment_properties()
-        features = (harfbuzz.Feature(tag = harfbuzz.HB.TAG(b'liga'), value = 0), harfbuzz.Feature(tag = harfbuzz.HB.TAG(b'kern'), value = 1))
+        features = [harfbuzz.Feature(tag=harfbuzz.HB.TAG(tag), value=value) for tag, value in FontManager.features]
         harfbuzz.shape(FontManager.fonts[fontname]['harfbuzz_font'], harfbuzz_buffer, features)
-        positions = harfbuzz_buffer.glyph_positions
+
+        # chars which don't start a cluster get no advance of their own
+        advances = [0] * len(text)
+        for cluster, x_advance in zip(harfbuzz_buffer.get_clusters(), harfbuzz_buffer.get_x_advances()):
+            advances[cluster] += x_advance
 
         result = []
-        for i, char in enumerate(text):
+        for char, advance in zip(text, advances):
             if char not in FontManager.fonts[fontname]['char_extents']:
                 FontManager.load_glyph(char, fontname=fontname)
-            extents = FontManager.fonts[fontname]['char_extents'][char][:]
-            extents[0] = int(positions[i].x_advance)
-            result.append(extents)
+            width, height, left, top = FontManager.fonts[fontname]['char_extents'][char]
+            result.append((int(advance / 64), height, left, top))
 
         return result
+
+    def clear_shaping_cache():
+        FontManager.shaping_cache = dict()
+        FontManager.shaping_cache_length = 0
+
+    def get_shaping_cache_stats():
+        return {'hits': FontManager.shaping_cache_hits, 'misses': FontManager.shaping_cache_misses, 'words': len(FontManager.shaping_cache), 'length': FontManager.shaping_cache_length}
  
-    def get_surface(char, fontname='book'):
-        if char not in FontManager.fonts[fontname]['surface_cache']:
+    def get_atlas(fontname='book'):
+        return FontManager.fonts[fontname]['atlas']
+
+    def get_atlas_rectangle(char, fontname='book'):
+        ''' Where the glyph of char sits in the atlas of the font, as
+            (x, y, width, height), or None if it has no pixels. '''
+
+        if char not in FontManager.fonts[fontname]['atlas_rectangles']:
             FontManager.load_glyph(char, fontname=fontname)
 
-        return FontManager.fonts[fontname]['surface_cache'][char]
+        return FontManager.fonts[fontname]['atlas_rectangles'][char]
 
     def load_glyph(char, fontname='book'):
         if char not in FontManager.fonts[fontname]['char_extents']:
@@ -119,8 +219,51 @@ class FontManager():
 
             FontManager.fonts[fontname]['char_extents'][char] = [width, height, left, top]
             if FontManager.fonts[fontname]['face'].glyph.bitmap.width > 0:
-                FontManager.fonts[fontname]['surface_cache'][char] = FontManager.fonts[fontname]['face'].glyph.bitmap.make_image_surface()
+                surface = FontManager.fonts[fontname]['face'].glyph.bitmap.make_image_surface()
+                FontManager.fonts[fontname]['atlas_rectangles'][char] = FontManager.add_to_atlas(surface, fontname=fontname)
             else:
-                FontManager.fonts[fontname]['surface_cache'][char] = None
+                FontManager.fonts[fontname]['atlas_rectangles'][char] = None
+
+    def add_to_atlas(surface, fontname='book'):
+        ''' Glyphs are packed into rows of a single A8 surface per font,
+            which doubles its height whenever it runs full, and its width
+            for glyphs too wide to fit. Two pixels of padding keep
+            filtering from picking up neighbours. '''
+
+        font = FontManager.fonts[fontname]
+        width, height = surface.get_width(), surface.get_height()
+        padding = 2
+
+        atlas = font['atlas']
+        atlas_width = 512 if atlas == None else atlas.get_width()
+        atlas_height = 64 if atlas == None else atlas.get_height()
+
+        x, y, row_height = font['atlas_shelf']
+        if x > 0 and x + width + padding > atlas_width:
+            x, y, row_height = 0, y + row_height + padding, 0
+
+        while x + width + padding > atlas_width:
+            atlas_width *= 2
+        while y + height + padding > atlas_height:
+            atlas_height *= 2
+
+        if atlas == None or atlas_width > atlas.get_width() or atlas_height > atlas.get_height():
+            new_atlas = cairo.ImageSurface(cairo.FORMAT_A8, atlas_width, atlas_height)
+            if atlas != None:
+                ctx = cairo.Context(new_atlas)
+                ctx.set_source_surface(atlas, 0, 0)
+                ctx.paint()
+            font['atlas'] = atlas = new_atlas
+
+        assert x + padding + width <= atlas.get_width() and y + padding + height <= atlas.get_height()
+
+        ctx = cairo.Context(atlas)
+        ctx.set_operator(cairo.OPERATOR_SOURCE)
+        ctx.set_source_surface(surface, x + padding, y + padding)
+        ctx.rectangle(x + padding, y + padding, width, height)
+        ctx.fill()
+
+        font['atlas_shelf'] = (x + width + padding, y, max(row_height, height))
+        return (x + padding, y + padding, width, height)
 
 
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# Copyright (C) 2017-present Robert Griesel
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>
+
+import os, os.path, hashlib, time
+
+from lemma.infrastructure.service_locator import ServiceLocator
+
+
+class ImageStore():
+    ''' Images are stored once in the notes folder, under a name
+        derived from a hash of their content. Documents only
+        reference them by that name. '''
+
+    def get_pathname(name):
+        return os.path.join(ServiceLocator.get_notes_folder(), name)
+
+    def is_stored_name(name):
+        hash_value, divider, ending = name.partition('.')
+        return len(hash_value) == 64 and divider == '.' and all(char in '0123456789abcdef' for char in hash_value)
+
+    def is_legacy_name(name):
+        document_id, divider, rest = name.partition('-')
+        return document_id.isdigit() and divider == '-' and rest.partition('.')[0].isdigit()
+
+    def add_file(filename, ending):
+        name = os.path.basename(filename)
+        if ImageStore.is_stored_name(name) and os.path.dirname(os.path.abspath(filename)) == ServiceLocator.get_notes_folder():
+            return name
+
+        with open(filename, 'rb') as file:
+            data = file.read()
+        return ImageStore.add_data(data, ending)
+
+    def add_data(data, ending):
+        name = hashlib.sha256(data).hexdigest() + ending
+        pathname = ImageStore.get_pathname(name)
+
+        if os.path.isfile(pathname):
+            os.utime(pathname) # protect it from a garbage collection that's already running
+        else:
+            with open(pathname + '.tmp', 'wb') as file:
+                file.write(data)
+            os.replace(pathname + '.tmp', pathname)
+
+        return name
+
+    def contains(name):
+        return os.path.isfile(ImageStore.get_pathname(name))
+
+    def collect_garbage(referenced_names, start_time=None):
+        if start_time == None:
+            start_time = time.time()
+
+        for direntry in os.scandir(ServiceLocator.get_notes_folder()):
+            if direntry.name in referenced_names: continue
+            if not ImageStore.is_stored_name(direntry.name) and not ImageStore.is_legacy_name(direntry.name): continue
+
+            try:
+                if direntry.stat().st_mtime < start_time:
+                    os.remove(direntry.path)
+            except FileNotFoundError: pass
+
+
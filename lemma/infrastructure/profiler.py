@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# Copyright (C) 2017-present Robert Griesel
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>
+
+import os, os.path, time, math, json, threading
+from collections import deque
+
+from lemma.infrastructure.service_locator import ServiceLocator
+
+
+class Profiler():
+    ''' Records wall time of commands and pipeline stages, if enabled
+        by the hidden 'profiling' preference or the LEMMA_PROFILE
+        environment variable. LEMMA_PROFILE may hold the path of the
+        report, which is written as JSON on exit. '''
+
+    is_enabled = False
+    pathname = None
+    max_samples = 1000
+
+    # rolling window of recent samples, all time count and sum, slowest sample
+    samples = dict()
+    totals = dict()
+    slowest = dict()
+    lock = threading.Lock()
+
+    def init(enabled_by_preference=False):
+        value = os.environ.get('LEMMA_PROFILE', '')
+
+        if value not in ['', '0', '1']:
+            Profiler.pathname = os.path.expanduser(value)
+        else:
+            Profiler.pathname = os.path.join(ServiceLocator.get_config_folder(), 'profile.json')
+        Profiler.is_enabled = (value not in ['', '0']) or enabled_by_preference
+
+    def get_time():
+        return time.perf_counter()
+
+    def add_time(name, start_time, document_id=None):
+        if not Profiler.is_enabled: return
+
+        Profiler.add_sample(name, time.perf_counter() - start_time, document_id)
+
+    def add_sample(name, seconds, document_id=None):
+        if not Profiler.is_enabled: return
+
+        with Profiler.lock:
+            if name not in Profiler.samples:
+                Profiler.samples[name] = deque(maxlen=Profiler.max_samples)
+                Profiler.totals[name] = [0, 0]
+                Profiler.slowest[name] = (0, None)
+
+            Profiler.samples[name].append(seconds)
+            Profiler.totals[name][0] += 1
+            Profiler.totals[name][1] += seconds
+            if seconds > Profiler.slowest[name][0]:
+                Profiler.slowest[name] = (seconds, document_id)
+
+    def get_report():
+        ''' Times in milliseconds. Percentiles are over the most recent
+            samples, count, total and slowest over the whole session. '''
+
+        report = dict()
+        with Profiler.lock:
+            for name, samples in Profiler.samples.items():
+                ordered_samples = sorted(samples)
+                count, total = Profiler.totals[name]
+                seconds, document_id = Profiler.slowest[name]
+
+                report[name] = dict()
+                report[name]['count'] = count
+                report[name]['total'] = total * 1000
+                report[name]['mean'] = total * 1000 / count
+                for percentile in [50, 90, 99]:
+                    report[name]['p' + str(percentile)] = Profiler.get_percentile(ordered_samples, percentile) * 1000
+                report[name]['slowest'] = seconds * 1000
+                report[name]['slowest_document_id'] = document_id
+        return report
+
+    def get_percentile(ordered_samples, percentile):
+        rank = math.ceil(len(ordered_samples) * percentile / 100)
+        return ordered_samples[max(rank - 1, 0)]
+
+    def dump():
+        if not Profiler.is_enabled: return
+
+        try:
+            with open(Profiler.pathname, 'w') as file:
+                json.dump(Profiler.get_report(), file, indent=4, sort_keys=True)
+        except OSError: pass
+
+
@@ -51,6 +51,9 @@ class ServiceLocator():
     def get_notes_folder():
         return os.path.expanduser(ServiceLocator.get_config_folder() + '/notes')
 
+    def get_undo_history_folder():
+        return os.path.expanduser(ServiceLocator.get_config_folder() + '/undo_history')
+
     def get_user_themes_folder():
         return os.path.expanduser(ServiceLocator.get_config_folder() + '/themes')
 
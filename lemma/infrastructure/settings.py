@@ -62,6 +62,10 @@ class Settings(Observable):
 
         self.defaults['preferences'] = dict()
         self.defaults['preferences']['color_scheme'] = 'default'
+        self.defaults['preferences']['save_delay'] = 1
+        self.defaults['preferences']['undo_memory_budget'] = 16 * 1024 * 1024
+        self.defaults['preferences']['spill_undo_history'] = True
+        self.defaults['preferences']['profiling'] = False
 
     def get_value(self, section, item):
         try: value = self.data[section][item]
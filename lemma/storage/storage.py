@@ -15,10 +15,15 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>
 
-import os, os.path, pickle
+import os, os.path, pickle, threading, time
+
+from gi.repository import GLib
 
 from lemma.document.document import Document
+from lemma.document.ast.link import Link
 from lemma.infrastructure.service_locator import ServiceLocator
+from lemma.infrastructure.image_store import ImageStore
+from lemma.storage.writer import Writer
 
 
 class Storage(object):
@@ -30,18 +35,64 @@ class Storage(object):
         if not os.path.exists(self.pathname):
             os.mkdir(self.pathname)
 
+        self.undo_history_pathname = ServiceLocator.get_undo_history_folder()
+        if os.path.isdir(self.undo_history_pathname):
+            for direntry in os.scandir(self.undo_history_pathname):
+                if direntry.is_file(): os.remove(direntry.path)
+        else:
+            os.mkdir(self.undo_history_pathname)
+
+        self.index = dict()
+        self.writer = Writer(ServiceLocator.get_settings().get_value('preferences', 'save_delay'))
+
+        # changed documents are serialized once per save delay, not on every change
+        self.changed_documents = set()
+        self.save_timeout_id = None
+
     def populate_documents(self):
+        self.load_index()
+        index_changed = False
+
         for direntry in os.scandir(self.pathname):
             if direntry.is_file() and direntry.name.isdigit():
                 document = Document(int(direntry.name))
-                document.last_modified = os.path.getmtime(direntry.path)
+                stat = direntry.stat()
+
+                entry = self.index.get(document.id)
+                if entry != None and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+                    document.title = entry['title']
+                    document.last_modified = entry['last_modified']
+                    document.plaintext = entry['plaintext']
+                    document.links = [Link(target) for target in entry['links']]
+                    document.defer_loading(direntry.path)
+                else:
+                    document.last_modified = stat.st_mtime
+
+                    with open(direntry.path, 'r') as file:
+                        html = file.read()
+                    document.add_command('populate_from_html', html, self.pathname)
+                    document.command_processor.reset_undo_stack()
+
+                    # rewrite files still referencing images outside of the image store
+                    if document.html != html:
+                        self.save_document(document)
+                    else:
+                        self.update_index_entry(document, stat.st_mtime_ns, stat.st_size)
+                    index_changed = True
+
+                self.init_undo_history(document)
+                self.workspace.add(document)
 
-                with open(direntry.path, 'r') as file:
-                    html = file.read()
-                document.add_command('populate_from_html', html, self.pathname)
-                document.command_processor.reset_undo_stack()
+        for document_id in list(self.index):
+            if self.workspace.get_by_id(document_id) == None:
+                del(self.index[document_id])
+                index_changed = True
 
-                self.workspace.add(document)
+        if index_changed:
+            self.save_index()
+
+        thread = threading.Thread(target=self.collect_garbage, args=(time.time(),), daemon=True)
+        thread.start()
 
     def populate_workspace(self):
         pathname = os.path.join(self.pathname, 'workspace')
@@ -51,7 +102,10 @@ class Storage(object):
             data = pickle.loads(file.read())
 
             self.workspace.active_document = self.workspace.get_by_id(data['active_document_id'])
-            if self.workspace.active_document != None: self.workspace.active_document.connect('changed', self.workspace.on_document_change)
+            if self.workspace.active_document != None:
+                self.workspace.active_document.load()
+                self.workspace.active_document.connect('changed', self.workspace.on_document_change)
+                self.workspace.active_document.connect('view_changed', self.workspace.on_document_view_change)
 
             for document_id in data['history']:
                 document = self.workspace.get_by_id(document_id)
@@ -67,52 +121,117 @@ class Storage(object):
         self.workspace.connect('new_document', self.on_new_document)
         self.workspace.connect('document_removed', self.on_document_removed)
         self.workspace.connect('changed', self.on_workspace_changed)
+        self.workspace.connect('shutdown', self.on_shutdown)
         self.workspace.history.connect('changed', self.on_history_change)
 
     def on_workspace_changed(self, workspace):
         self.save_workspace()
+        self.save_index()
 
     def on_history_change(self, history):
         self.save_workspace()
+        self.save_index()
+
+    def on_shutdown(self, workspace):
+        if self.save_timeout_id != None:
+            GLib.source_remove(self.save_timeout_id)
+        self.save_changed_documents()
+        self.save_index()
+        self.writer.flush()
 
     def on_new_document(self, workspace, document):
+        self.init_undo_history(document)
         document.update()
         self.save_document(document)
         document.connect('changed', self.on_document_change)
 
     def on_document_removed(self, workspace, document):
         document.disconnect('changed', self.on_document_change)
+        self.changed_documents.discard(document)
+        document.command_processor.remove_spill_file()
         self.delete_document(document)
 
+    def init_undo_history(self, document):
+        settings = ServiceLocator.get_settings()
+
+        document.command_processor.set_memory_budget(settings.get_value('preferences', 'undo_memory_budget'))
+        if settings.get_value('preferences', 'spill_undo_history'):
+            document.command_processor.set_spill_pathname(os.path.join(self.undo_history_pathname, str(document.id)))
+
     def on_document_change(self, document):
-        self.save_document(document)
+        self.changed_documents.add(document)
+        if self.save_timeout_id == None:
+            self.save_timeout_id = GLib.timeout_add(int(self.writer.delay * 1000), self.save_changed_documents)
+
+    def save_changed_documents(self):
+        self.save_timeout_id = None
+        for document in self.changed_documents:
+            self.save_document(document)
+        self.changed_documents = set()
+        return False
 
     def save_document(self, document):
         pathname = os.path.join(self.pathname, str(document.id))
 
-        try: filehandle = open(pathname, 'w')
-        except IOError: pass
-        else:
-            filehandle.write(document.html)
+        data = document.html.encode('utf-8')
+
+        # the file mtime doubles as the last modified time of the document.
+        self.writer.write(pathname, data, mtime=document.last_modified)
+        self.update_index_entry(document, int(document.last_modified * 1000000000), len(data))
 
     def delete_document(self, document):
         pathname = os.path.join(self.pathname, str(document.id))
-        os.remove(pathname)
+        self.writer.delete(pathname)
+
+        if document.id in self.index:
+            del(self.index[document.id])
 
     def save_workspace(self):
         pathname = os.path.join(self.pathname, 'workspace')
 
-        try: filehandle = open(pathname, 'wb')
-        except IOError: pass
+        if self.workspace.active_document != None:
+            active_document_id = self.workspace.active_document.id
         else:
-            if self.workspace.active_document != None:
-                active_document_id = self.workspace.active_document.id
-            else:
-                active_document_id = None
+            active_document_id = None
+
+        data = {'active_document_id': active_document_id,
+                'history': self.get_history_list()}
+        self.writer.write(pathname, pickle.dumps(data))
 
-            data = {'active_document_id': active_document_id,
-                    'history': self.get_history_list()}
-            filehandle.write(pickle.dumps(data))
+    def load_index(self):
+        pathname = os.path.join(self.pathname, 'index')
+        if not os.path.isfile(pathname): return
+
+        with open(pathname, 'rb') as file:
+            try: data = pickle.loads(file.read())
+            except (EOFError, pickle.UnpicklingError): return
+
+        if data.get('version') == 2:
+            self.index = data['documents']
+
+    def save_index(self):
+        pathname = os.path.join(self.pathname, 'index')
+
+        self.writer.write(pathname, pickle.dumps({'version': 2, 'documents': self.index}))
+
+    def update_index_entry(self, document, mtime_ns, size):
+        links = list(dict.fromkeys([link.target for link in document.links]))
+        self.index[document.id] = {'mtime_ns': mtime_ns,
+                                   'size': size,
+                                   'title': document.title,
+                                   'last_modified': document.last_modified,
+                                   'plaintext': document.plaintext,
+                                   'links': links,
+                                   'images': [image.get_name() for image in document.images]}
+
+    def collect_garbage(self, start_time):
+        referenced_names = set()
+        for entry in list(self.index.values()):
+            referenced_names.update(entry['images'])
+
+        # make sure no file on disk still references an image about to be removed
+        self.writer.flush()
+        ImageStore.collect_garbage(referenced_names, start_time)
 
     def get_history_list(self):
         history_list = []
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# Copyright (C) 2017-present Robert Griesel
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>
+
+import os, os.path, threading, time
+
+from lemma.infrastructure.profiler import Profiler
+
+
+class Writer(object):
+    ''' Writes files from a worker thread. Jobs for the same file
+        replace each other, so only the latest snapshot gets written
+        once no new jobs came in for the given delay. '''
+
+    def __init__(self, delay=1):
+        self.delay = delay
+
+        self.jobs = dict()
+        self.last_change = 0
+        self.is_writing = False
+        self.flush_requested = False
+        self.condition = threading.Condition()
+
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def write(self, pathname, data, mtime=None):
+        self.add_job(pathname, ('write', data, mtime))
+
+    def delete(self, pathname):
+        self.add_job(pathname, ('delete', None, None))
+
+    def add_job(self, pathname, job):
+        with self.condition:
+            self.jobs[pathname] = job
+            self.last_change = time.time()
+            self.condition.notify_all()
+
+    def flush(self):
+        ''' Write all pending jobs right away and wait until they are done. '''
+
+        with self.condition:
+            self.flush_requested = True
+            self.condition.notify_all()
+            while len(self.jobs) > 0 or self.is_writing:
+                self.condition.wait()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while True:
+                    if len(self.jobs) == 0:
+                        self.flush_requested = False
+                        self.condition.notify_all()
+                        self.condition.wait()
+                    elif self.flush_requested:
+                        break
+                    else:
+                        remaining_time = self.last_change + self.delay - time.time()
+                        if remaining_time <= 0: break
+                        self.condition.wait(remaining_time)
+
+                jobs = self.jobs
+                self.jobs = dict()
+                self.is_writing = True
+
+            start_time = Profiler.get_time()
+            self.process_jobs(jobs)
+            Profiler.add_time('storage_write', start_time)
+
+            with self.condition:
+                self.is_writing = False
+                self.condition.notify_all()
+
+    def process_jobs(self, jobs):
+        written_files = list()
+        folders = set()
+
+        for pathname, (action, data, mtime) in jobs.items():
+            folders.add(os.path.dirname(pathname))
+
+            if action == 'delete':
+                try: os.remove(pathname)
+                except FileNotFoundError: pass
+
+            elif action == 'write':
+                try: filehandle = open(pathname + '.tmp', 'wb')
+                except IOError: continue
+                else:
+                    filehandle.write(data)
+                    filehandle.flush()
+                    written_files.append((pathname, filehandle, mtime))
+
+        # sync all files of the batch before any of them replaces its predecessor
+        for pathname, filehandle, mtime in written_files:
+            os.fsync(filehandle.fileno())
+            filehandle.close()
+
+        for pathname, filehandle, mtime in written_files:
+            if mtime != None:
+                mtime_ns = int(mtime * 1000000000)
+                os.utime(pathname + '.tmp', ns=(mtime_ns, mtime_ns))
+            os.replace(pathname + '.tmp', pathname)
+
+        for folder in folders:
+            try: fd = os.open(folder, os.O_RDONLY)
+            except IOError: continue
+            else:
+                os.fsync(fd)
+                os.close(fd)
+
+
@@ -91,6 +91,7 @@ class Actions(object):
         self.workspace.connect('document_removed', self.on_document_removed)
         self.workspace.connect('new_active_document', self.on_new_active_document)
         self.workspace.connect('document_changed', self.on_document_change)
+        self.workspace.connect('document_view_changed', self.on_document_change)
         self.workspace.connect('mode_set', self.on_mode_set)
         self.update()
 
@@ -284,8 +285,8 @@ class Actions(object):
 
         char_nodes = [node for node in document.ast.get_subtree(*document.cursor.get_state()) if node.is_char()]
         all_tagged = True
-        for node in char_nodes:
-            if tagname not in node.tags: all_tagged = False
+        for first_node, last_node, style in document.ast.get_style_runs(char_nodes):
+            if tagname not in style.tags: all_tagged = False
 
         if len(char_nodes) > 0:
             if all_tagged:
@@ -39,12 +39,14 @@ class CursorState(Observable):
     def set_document(self, document):
         if self.document != None:
             self.document.disconnect('changed', self.on_change)
+            self.document.disconnect('view_changed', self.on_change)
 
         self.document = document
         self.update()
 
         if document != None:
             self.document.connect('changed', self.on_change)
+            self.document.connect('view_changed', self.on_change)
 
     def on_change(self, document):
         self.update()
@@ -75,8 +77,8 @@ class CursorState(Observable):
 
         char_nodes = [node for node in document.ast.get_subtree(*document.cursor.get_state()) if node.is_char()]
         all_tagged = True
-        for node in char_nodes:
-            if tagname not in node.tags: all_tagged = False
+        for first_node, last_node, style in document.ast.get_style_runs(char_nodes):
+            if tagname not in style.tags: all_tagged = False
 
         if len(char_nodes) > 0:
             if all_tagged:
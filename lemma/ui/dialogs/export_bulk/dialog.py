@@ -25,6 +25,7 @@ import os.path, os
 
 import lemma.ui.dialogs.export_bulk.export_bulk_viewgtk as view
 from lemma.infrastructure.service_locator import ServiceLocator
+from lemma.infrastructure.image_store import ImageStore
 
 
 class Dialog(object):
@@ -116,6 +117,7 @@ class Dialog(object):
 
         with zipfile.ZipFile(filename, 'x') as file:
             for document in self.current_values['documents']:
+                document.load()
 
                 if self.current_values['format'] == 'html':
                     html = document.html.replace('<body>', '<body><h1>' + document.title + '</h1>')
@@ -126,9 +128,9 @@ class Dialog(object):
                     markdown += html2text.html2text(document.html)
                     file.writestr(str(document.id) + '.md', markdown)
 
-                data_dir = ServiceLocator.get_notes_folder()
-                for include in [file for file in os.listdir(data_dir) if file.startswith(str(document.id) + '-')]:
-                    file.write(os.path.join(data_dir, include), arcname=include)
+                for name in set([image.get_name() for image in document.images]):
+                    if name not in file.namelist():
+                        file.write(ImageStore.get_pathname(name), arcname=name)
 
         self.view.close()
 
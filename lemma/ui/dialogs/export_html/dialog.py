@@ -23,6 +23,7 @@ from gi.repository import Gtk, Gio, GLib
 import os.path, shutil, os
 
 from lemma.infrastructure.service_locator import ServiceLocator
+from lemma.infrastructure.image_store import ImageStore
 
 
 class Dialog(object):
@@ -66,13 +67,12 @@ class Dialog(object):
                 if not filename.endswith('.html'):
                     filename += '.html'
 
-                data_dir = ServiceLocator.get_notes_folder()
                 files_folder = filename[:-5] + '_files'
                 has_files = False
-                for file in [file for file in os.listdir(data_dir) if file.startswith(str(self.document.id) + '-')]:
+                for name in set([image.get_name() for image in self.document.images]):
                     if not os.path.exists(files_folder):
                         os.makedirs(files_folder)
-                    shutil.copy(os.path.join(data_dir, file), files_folder)
+                    shutil.copy(ImageStore.get_pathname(name), files_folder)
                     has_files = True
 
                 html = self.document.html.replace('<body>', '<body><h1>' + self.document.title + '</h1>')
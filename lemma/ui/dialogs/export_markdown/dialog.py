@@ -25,6 +25,7 @@ import urllib.parse
 import html2text
 
 from lemma.infrastructure.service_locator import ServiceLocator
+from lemma.infrastructure.image_store import ImageStore
 
 
 class Dialog(object):
@@ -70,13 +71,12 @@ class Dialog(object):
                 if not filename.endswith('.md'):
                     filename += '.md'
 
-                data_dir = ServiceLocator.get_notes_folder()
                 files_folder = filename[:-3] + '_files'
                 has_files = False
-                for file in [file for file in os.listdir(data_dir) if file.startswith(str(self.document.id) + '-')]:
+                for name in set([image.get_name() for image in self.document.images]):
                     if not os.path.exists(files_folder):
                         os.makedirs(files_folder)
-                    shutil.copy(os.path.join(data_dir, file), files_folder)
+                    shutil.copy(ImageStore.get_pathname(name), files_folder)
                     has_files = True
 
                 markdown = '# ' + self.document.title + '\n'
@@ -178,11 +178,12 @@ class DocumentList(object):
                 ctx.fill()
 
             title_text = document.title
-            if len(document.plaintext) == 0:
+            plaintext_start = document.get_plaintext_start(100)
+            if len(plaintext_start) == 0:
                 teaser_text = '(' + _('empty') + ')'
                 teaser_color = sidebar_fg_2
             else:
-                teaser_text = ' '.join(document.plaintext.splitlines())[:100].strip()
+                teaser_text = ' '.join(plaintext_start.splitlines())[:100].strip()
             date_text = document.get_last_modified_string()
 
             Gdk.cairo_set_source_rgba(ctx, title_color)
@@ -19,12 +19,14 @@ import gi
 gi.require_version('Gtk', '4.0')
 from gi.repository import Gtk, Gdk
 
-import time
+import time, statistics
+from collections import deque
 from urllib.parse import urlparse
 
 from lemma.ui.document_view.document_view_controller import DocumentViewController
 from lemma.ui.document_view.document_view_presenter import DocumentViewPresenter
 from lemma.ui.title_widget.title_widget import TitleWidget
+from lemma.infrastructure.profiler import Profiler
 from lemma.helpers.observable import Observable
 
 
@@ -45,6 +47,10 @@ class DocumentView(Observable):
         self.link_target_at_pointer = None
         self.last_cursor_or_scrolling_change = time.time()
 
+        # when the oldest input not yet on screen came in, and recent input to frame latencies
+        self.input_time = None
+        self.input_latencies = deque(maxlen=120)
+
         self.workspace = workspace
         self.document = None
 
@@ -64,6 +70,7 @@ class DocumentView(Observable):
         self.set_document(workspace.get_active_document())
         self.workspace.connect('new_active_document', self.on_new_active_document)
         self.workspace.connect('document_changed', self.on_document_change)
+        self.workspace.connect('document_view_changed', self.on_document_change)
         self.workspace.connect('mode_set', self.on_mode_set)
 
         self.add_change_code('changed')
@@ -108,8 +115,10 @@ class DocumentView(Observable):
             self.add_change_code('changed')
 
     def set_document(self, document):
+        self.controller.end_input_batch()
         if self.document != None:
             self.document.disconnect('changed', self.on_change)
+            self.document.disconnect('view_changed', self.on_change)
 
         self.document = document
         self.update_link_at_cursor()
@@ -120,6 +129,20 @@ class DocumentView(Observable):
 
         if document != None:
             self.document.connect('changed', self.on_change)
+            self.document.connect('view_changed', self.on_change)
+
+    def add_frame_drawn(self):
+        if self.input_time != None:
+            latency = time.perf_counter() - self.input_time
+            self.input_latencies.append(latency)
+            Profiler.add_sample('input_latency', latency, self.document.id)
+            self.input_time = None
+
+    def get_input_latency(self):
+        ''' Median time in milliseconds from key events to the frames showing their result. '''
+
+        if len(self.input_latencies) == 0: return None
+        return statistics.median(self.input_latencies) * 1000
 
     def on_change(self, document):
         self.update_link_at_cursor()
@@ -33,6 +33,9 @@ class DocumentViewController():
         self.view = self.model.view
         self.content = self.view.content
 
+        self.batch_document = None
+        self.batch_start_time = None
+
         self.primary_click_controller = Gtk.GestureClick()
         self.primary_click_controller.set_button(1)
         self.primary_click_controller.connect('pressed', self.on_primary_button_press)
@@ -240,6 +243,7 @@ class DocumentViewController():
         modifiers = Gtk.accelerator_get_default_mod_mask()
 
         document = self.model.document
+        self.begin_input_batch()
         match (Gdk.keyval_name(keyval).lower(), int(state & modifiers)):
             case ('left', 0): document.add_command('left')
             case ('right', 0): document.add_command('right')
@@ -293,6 +297,7 @@ class DocumentViewController():
         if self.model.document == None: return False
         document = self.model.document
         cursor_state = self.model.application.cursor_state
+        self.begin_input_batch()
 
         if document.cursor.has_selection():
             document.add_composite_command(['delete_selection'], ['insert_text', text, None, cursor_state.tags_at_cursor])
@@ -327,6 +332,7 @@ class DocumentViewController():
         self.view.content.queue_draw()
 
     def on_focus_out(self, controller):
+        self.end_input_batch()
         self.im_context.focus_out()
         self.view.content.queue_draw()
 
@@ -353,6 +359,31 @@ class DocumentViewController():
         self.model.last_cursor_or_scrolling_change = time.time()
         self.model.document.add_command('scroll_to_xy', offset_x, offset_y)
 
+    def begin_input_batch(self):
+        ''' Key events arriving before the next frame still run their
+            commands one by one, each with its own undo step, but the
+            document publishes their result only once, on the frame tick. '''
+
+        if self.batch_document != None: return
+
+        self.batch_document = self.model.document
+        self.batch_start_time = time.perf_counter()
+        self.batch_document.begin_transaction()
+        self.content.add_tick_callback(self.on_frame_tick)
+
+    def on_frame_tick(self, widget, frame_clock):
+        self.end_input_batch()
+        return False
+
+    def end_input_batch(self):
+        if self.batch_document == None: return
+
+        document = self.batch_document
+        self.batch_document = None
+        if document.unpublished_change_code != None and self.model.input_time == None:
+            self.model.input_time = self.batch_start_time
+        document.end_transaction()
+
     def open_link(self, link_target):
         workspace = self.model.workspace
 
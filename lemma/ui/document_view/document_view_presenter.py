@@ -22,10 +22,12 @@ from gi.repository import Gtk, GObject, Gdk, PangoCairo
 from urllib.parse import urlparse
 import datetime
 import time
+import math
 import cairo
 
 from lemma.infrastructure.font_manager import FontManager
 from lemma.infrastructure.color_manager import ColorManager
+from lemma.infrastructure.profiler import Profiler
 
 
 class DocumentViewPresenter():
@@ -39,6 +41,15 @@ class DocumentViewPresenter():
         self.scrolling_job = None
         self.fontname = None
         self.fg_color = None
+        self.font_key = None
+        self.insert_box = None
+
+        # rendered lines by line box, least recently used first
+        self.line_cache = dict()
+        self.line_cache_size = 0
+        self.line_cache_budget = 32 * 1024 * 1024
+        self.line_cache_key = None
+        self.line_cache_margin = 8
 
         self.content.set_draw_func(self.draw)
 
@@ -193,17 +204,104 @@ class DocumentViewPresenter():
     def draw(self, widget, ctx, width, height):
         if self.model.document == None: return
 
+        start_time = Profiler.get_time()
+        document = self.model.document
         self.cursor_coords = None
-        self.current_node_in_selection = False
-        self.first_cursor_node = self.model.document.cursor.get_first_node()
-        self.last_cursor_node = self.model.document.cursor.get_last_node()
-        scrolling_offset_y = self.model.document.clipping.offset_y
+        self.insert_box = document.cursor.get_insert_node().box if not document.cursor.has_selection() else None
+        self.first_cursor_node = document.cursor.get_first_node()
+        self.last_cursor_node = document.cursor.get_last_node()
+        self.font_key = None
+        scrolling_offset_y = document.clipping.offset_y
 
         self.draw_title(ctx, self.view.padding_left, self.view.padding_top - scrolling_offset_y)
 
-        self.draw_box(ctx, self.model.document.layout, self.view.padding_left, self.view.padding_top + self.view.title_height + self.view.subtitle_height + self.view.title_buttons_height - scrolling_offset_y)
+        offset_x = self.view.padding_left
+        offset_y = self.view.padding_top + self.view.title_height + self.view.subtitle_height + self.view.title_buttons_height - scrolling_offset_y
+        offset_y = round(offset_y * self.content.get_scale_factor()) / self.content.get_scale_factor()
+        clip_x1, clip_y1, clip_x2, clip_y2 = ctx.clip_extents()
+        lines = document.layout.get_children_in_range(clip_y1 - offset_y, clip_y2 - offset_y)
+
+        if len(lines) > 0:
+            self.current_node_in_selection = self.is_in_selection(lines[0].children[0].node)
+        self.update_line_cache_key(document)
+        for line in lines:
+            if self.is_line_cacheable(line):
+                self.draw_cached_line(ctx, line, offset_x + line.x, offset_y + line.y)
+            else:
+                self.draw_line(ctx, line, offset_x + line.x, offset_y + line.y)
 
         self.draw_cursor(ctx)
+        Profiler.add_time('draw', start_time, document.id)
+
+        self.model.add_frame_drawn()
+
+    def is_in_selection(self, node):
+        if self.first_cursor_node == self.last_cursor_node: return False
+
+        position = node.get_position_tuple()
+        return self.first_cursor_node.get_position_tuple() <= position < self.last_cursor_node.get_position_tuple()
+
+    def update_line_cache_key(self, document):
+        ''' Rendered lines are only valid for the document, scale and
+            colors they were drawn with. '''
+
+        colors = tuple(ColorManager.get_ui_color(name).to_string() for name in ['text', 'links', 'links_page_not_existing', 'math'])
+        key = (document, self.content.get_scale_factor(), colors)
+        if key != self.line_cache_key:
+            self.line_cache = dict()
+            self.line_cache_size = 0
+            self.line_cache_key = key
+
+    def is_line_cacheable(self, line):
+        if self.current_node_in_selection: return False
+        if self.first_cursor_node.box != None and self.first_cursor_node.box.parent == line: return False
+        if self.last_cursor_node.box != None and self.last_cursor_node.box.parent == line: return False
+        return True
+
+    def draw_cached_line(self, ctx, line, offset_x, offset_y):
+        ''' Lines are keyed by their box. The layouter replaces the boxes
+            of every paragraph it lays out again, so entries of changed
+            lines are never hit again and drop out once the cache is
+            over budget. '''
+
+        entry = self.line_cache.pop(line, None)
+        if entry != None and not self.are_link_colors_current(entry[2]):
+            self.line_cache_size -= entry[1]
+            entry = None
+        if entry == None:
+            entry = self.render_line(line)
+            self.line_cache_size += entry[1]
+        self.line_cache[line] = entry
+
+        while self.line_cache_size > self.line_cache_budget and len(self.line_cache) > 1:
+            oldest_line = next(iter(self.line_cache))
+            self.line_cache_size -= self.line_cache.pop(oldest_line)[1]
+
+        scale = self.line_cache_key[1]
+        surface = entry[0]
+        x = round((offset_x - self.line_cache_margin) * scale) / scale
+        y = round((offset_y - math.ceil(line.height / 2)) * scale) / scale
+        ctx.set_source_surface(surface, x, y)
+        ctx.rectangle(x, y, surface.get_width() / scale, surface.get_height() / scale)
+        ctx.fill()
+
+    def render_line(self, line):
+        scale = self.line_cache_key[1]
+        width = line.width + 2 * self.line_cache_margin
+        height = line.height + 2 * math.ceil(line.height / 2)
+
+        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, math.ceil(width * scale), math.ceil(height * scale))
+        surface.set_device_scale(scale, scale)
+        self.draw_line(cairo.Context(surface), line, self.line_cache_margin, math.ceil(line.height / 2))
+
+        link_targets = set(box.node.link.target for box in line.children if box.node.link != None)
+        link_colors = tuple((target, self.get_link_color_name(target)) for target in link_targets)
+        return (surface, surface.get_stride() * surface.get_height(), link_colors)
+
+    def are_link_colors_current(self, link_colors):
+        for target, color_name in link_colors:
+            if self.get_link_color_name(target) != color_name: return False
+        return True
 
     def draw_title(self, ctx, offset_x, offset_y):
         ctx.move_to(offset_x, offset_y)
@@ -222,51 +320,82 @@ class DocumentViewPresenter():
         ctx.rectangle(offset_x, offset_y + self.view.title_height, self.view.title_width, 1)
         ctx.fill()
 
-    def draw_box(self, ctx, box, offset_x, offset_y):
-        if box.type == 'vcontainer':
-            for child in box.children:
-                self.draw_box(ctx, child, offset_x, offset_y)
-                offset_y += child.height
-
-        if box.type == 'hcontainer':
-            for child in box.children:
-                self.draw_box(ctx, child, offset_x, offset_y)
-                offset_x += child.width
-
-        if box == self.model.document.cursor.get_insert_node().box and not self.model.document.cursor.has_selection():
-            self.cursor_coords = (offset_x, offset_y + box.parent.height - box.height, 1, box.height)
-        if box.node == self.first_cursor_node:
-            self.current_node_in_selection = True
-        if box.node == self.last_cursor_node:
-            self.current_node_in_selection = False
-
-        if box.type in ['glyph', 'empty']:
-            self.update_fontname(box.node)
-            self.update_fg_color(box.node)
-
-        if box.type in ['glyph', 'image']:
-            if self.current_node_in_selection:
-                Gdk.cairo_set_source_rgba(ctx, ColorManager.get_ui_color('selection_bg'))
-                ctx.rectangle(offset_x, offset_y, box.width, box.parent.height)
-                ctx.fill()
-
-        if box.type == 'glyph':
-            surface = FontManager.get_surface(box.node.value, fontname=self.fontname)
-
-            if surface != None:
-                ctx.set_source_surface(surface, offset_x + box.left, offset_y + box.parent.height + box.top)
-                pattern = ctx.get_source()
-                pattern.set_filter(cairo.Filter.BEST)
-                Gdk.cairo_set_source_rgba(ctx, self.fg_color)
-                ctx.mask(pattern)
+    def draw_line(self, ctx, line, offset_x, offset_y):
+        ''' Draws selection backgrounds and images box by box, then the
+            glyphs of the line in runs sharing font and color. '''
+
+        runs = []
+        for box in line.children:
+            x = offset_x + box.x
+
+            if box == self.insert_box:
+                self.cursor_coords = (x, offset_y + line.height - box.height, 1, box.height)
+            if box.node == self.first_cursor_node:
+                self.current_node_in_selection = True
+            if box.node == self.last_cursor_node:
+                self.current_node_in_selection = False
+
+            if box.type in ['glyph', 'empty']:
+                font_key = (box.node.type, box.node.style, box.node.link)
+                if font_key != self.font_key:
+                    self.font_key = font_key
+                    self.update_fontname(box.node)
+                    self.update_fg_color(box.node)
+
+            if box.type in ['glyph', 'image']:
+                if self.current_node_in_selection:
+                    Gdk.cairo_set_source_rgba(ctx, ColorManager.get_ui_color('selection_bg'))
+                    ctx.rectangle(x, offset_y, box.width, line.height)
+                    ctx.fill()
+
+            if box.type == 'glyph':
+                if len(runs) == 0 or runs[-1][0] != self.fontname or runs[-1][1] is not self.fg_color:
+                    runs.append((self.fontname, self.fg_color, []))
+                runs[-1][2].append((box.node.value, x + box.left, offset_y + line.height + box.top))
+
+            if box.type == 'image':
+                surface = box.node.value.get_cairo_surface()
+                ctx.set_source_surface(surface, x + box.left, offset_y + line.height - box.height + box.top)
+                ctx.rectangle(x + box.left, offset_y + line.height - box.height + box.top, box.width, box.height)
                 ctx.fill()
 
-        if box.type == 'image':
-            surface = box.node.value.get_cairo_surface()
-            ctx.set_source_surface(surface, offset_x + box.left, offset_y + box.parent.height - box.height + box.top)
-            ctx.rectangle(offset_x + box.left, offset_y + box.parent.height - box.height + box.top, box.width, box.height)
+        for fontname, fg_color, glyphs in runs:
+            self.draw_glyph_run(ctx, fontname, fg_color, glyphs)
+
+    def draw_glyph_run(self, ctx, fontname, fg_color, glyphs):
+        ''' Collects the coverage of all glyphs from the font's atlas in
+            a group, then paints it in the run's color with one mask. '''
+
+        rectangles = []
+        for char, x, y in glyphs:
+            rectangle = FontManager.get_atlas_rectangle(char, fontname=fontname)
+            if rectangle != None:
+                rectangles.append((x, y, rectangle))
+        if len(rectangles) == 0: return
+
+        left = min(x for x, y, rectangle in rectangles)
+        top = min(y for x, y, rectangle in rectangles)
+        right = max(x + rectangle[2] for x, y, rectangle in rectangles)
+        bottom = max(y + rectangle[3] for x, y, rectangle in rectangles)
+
+        ctx.save()
+        ctx.rectangle(left, top, right - left, bottom - top)
+        ctx.clip()
+        ctx.push_group_with_content(cairo.CONTENT_ALPHA)
+
+        pattern = cairo.SurfacePattern(FontManager.get_atlas(fontname))
+        pattern.set_filter(cairo.Filter.BEST)
+        for x, y, (atlas_x, atlas_y, width, height) in rectangles:
+            pattern.set_matrix(cairo.Matrix(x0=atlas_x - x, y0=atlas_y - y))
+            ctx.set_source(pattern)
+            ctx.rectangle(x, y, width, height)
             ctx.fill()
 
+        mask = ctx.pop_group()
+        Gdk.cairo_set_source_rgba(ctx, fg_color)
+        ctx.mask(mask)
+        ctx.restore()
+
     def draw_cursor(self, ctx):
         if self.cursor_coords == None: return
         if not self.content.has_focus(): return
@@ -293,11 +422,14 @@ class DocumentViewPresenter():
         if node.is_mathsymbol():
             self.fg_color = ColorManager.get_ui_color('math')
         elif node.link != None:
-            if urlparse(node.link.target).scheme in ['http', 'https'] or self.model.workspace.get_by_title(node.link.target) != None:
-                self.fg_color = ColorManager.get_ui_color('links')
-            else:
-                self.fg_color = ColorManager.get_ui_color('links_page_not_existing')
+            self.fg_color = ColorManager.get_ui_color(self.get_link_color_name(node.link.target))
         else:
             self.fg_color = ColorManager.get_ui_color('text')
 
+    def get_link_color_name(self, link_target):
+        if urlparse(link_target).scheme in ['http', 'https'] or self.model.workspace.get_by_title(link_target) != None:
+            return 'links'
+        else:
+            return 'links_page_not_existing'
+
 
@@ -63,6 +63,8 @@ class Panels(object):
 
     def save_quit(self):
         self.save_window_state()
+        self.app.document_view.controller.end_input_batch()
+        self.workspace.shutdown()
         self.app.quit()
 
     def restore_window_state(self):
@@ -34,6 +34,7 @@ class ToolBar(Observable):
 
         self.workspace.connect('new_active_document', self.on_new_active_document)
         self.workspace.connect('document_changed', self.on_document_change)
+        self.workspace.connect('document_view_changed', self.on_document_change)
 
     def on_new_active_document(self, workspace, document=None): self.update()
     def on_document_change(self, workspace, document): self.update()
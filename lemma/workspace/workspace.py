@@ -87,9 +87,14 @@ class Workspace(Observable):
         self.mode = 'documents'
         self.add_change_code('mode_set')
 
-        if self.active_document != None: self.active_document.disconnect('changed', self.on_document_change)
+        if self.active_document != None:
+            self.active_document.disconnect('changed', self.on_document_change)
+            self.active_document.disconnect('view_changed', self.on_document_view_change)
         self.active_document = document
-        if document != None: self.active_document.connect('changed', self.on_document_change)
+        if document != None:
+            self.active_document.load()
+            self.active_document.connect('changed', self.on_document_change)
+            self.active_document.connect('view_changed', self.on_document_view_change)
 
         if update_history and document != None:
             self.history.add(document)
@@ -97,6 +102,9 @@ class Workspace(Observable):
 
         self.add_change_code('new_active_document', document)
 
+    def shutdown(self):
+        self.add_change_code('shutdown')
+
     def get_new_document_id(self):
         return self.max_document_id + 1
 
@@ -105,6 +113,9 @@ class Workspace(Observable):
         self.documents.sort(key=attrgetter('last_modified'), reverse=True)
         self.add_change_code('document_changed', document)
 
+    def on_document_view_change(self, document):
+        self.add_change_code('document_view_changed', document)
+
     def update_links(self, document):
         if document.title in self.links_by_source:
             for target in self.links_by_source[document.title]:
@@ -123,9 +134,12 @@ class Workspace(Observable):
         if title_before in self.links_by_target:
             for document_title in self.links_by_target[title_before]:
                 document = self.get_by_title(document_title)
+                document.load()
                 documents.append(document)
                 for link in document.links:
-                    link.target = title_after
+                    if link.target == title_before:
+                        link.target = title_after
+                document.change_set.add_everything()
 
         document = self.get_by_title(title_before)
         documents.append(document)
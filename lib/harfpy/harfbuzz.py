@@ -27,6 +27,7 @@
 
 import ctypes as ct
 import array
+import sys
 from weakref import \
     ref as wref, \
     WeakValueDictionary
@@ -3147,20 +3148,22 @@ class Buffer :
         self.check_alloc()
     #end add_codepoints
 
-    def add_str(self, text, item_offset = None, item_length = None) :
+    def add_utf32(self, text, item_offset = None, item_length = None) :
+        "adds a Python str to the buffer in a single call, passing its characters" \
+        " as one UTF-32 block instead of a sequence of codepoint objects."
         if item_offset == None :
             item_offset = 0
         #end if
         if item_length == None :
             item_length = len(text)
         #end if
-        self.add_codepoints \
-          (
-            text = tuple(ord(c) for c in text),
-            text_length = len(text),
-            item_offset = item_offset,
-            item_length = item_length
-          )
+        c_text = text.encode(("utf-32-be", "utf-32-le")[sys.byteorder == "little"], "surrogatepass")
+        hb.hb_buffer_add_utf32(self._hbobj, c_text, len(text), item_offset, item_length)
+        self.check_alloc()
+    #end add_utf32
+
+    def add_str(self, text, item_offset = None, item_length = None) :
+        self.add_utf32(text, item_offset, item_length)
     #end add_str
 
     @property
@@ -3345,6 +3348,61 @@ class Buffer :
             tuple(GlyphPosition.from_hb(arr[i], self.autoscale) for i in range(nr_glyphs.value))
     #end glyph_positions
 
+    def _get_glyph_array(self, get_func, ctstruct, typecode) :
+        # views the buffer’s own glyph array as rows of 32-bit fields, without copying.
+        nr_glyphs = ct.c_uint()
+        addr = get_func(self._hbobj, ct.byref(nr_glyphs))
+        nr_fields = ct.sizeof(ctstruct) // 4
+        if addr == None or nr_glyphs.value == 0 :
+            return \
+                memoryview(array.array(typecode)), nr_fields
+        #end if
+        arr = (ctstruct * nr_glyphs.value).from_address(addr)
+        return \
+            memoryview(arr).cast("B").cast(typecode), nr_fields
+    #end _get_glyph_array
+
+    def get_glyph_infos_view(self) :
+        "returns the glyph infos as a flat memoryview of unsigned ints, one row of" \
+        " fields (codepoint, mask, cluster, private…) per glyph. No Python objects are" \
+        " created per glyph; the view is only valid until the buffer is next changed."
+        view, nr_fields = self._get_glyph_array(hb.hb_buffer_get_glyph_infos, HB.glyph_info_t, "I")
+        return \
+            view
+    #end get_glyph_infos_view
+
+    def get_glyph_positions_view(self) :
+        "returns the glyph positions as a flat memoryview of ints, one row of fields" \
+        " (x_advance, y_advance, x_offset, y_offset, private) per glyph, in unscaled" \
+        " position_t units. The view is only valid until the buffer is next changed."
+        view, nr_fields = self._get_glyph_array(hb.hb_buffer_get_glyph_positions, HB.glyph_position_t, "i")
+        return \
+            view
+    #end get_glyph_positions_view
+
+    def get_clusters(self) :
+        "returns a strided memoryview of the cluster of every glyph."
+        view, nr_fields = self._get_glyph_array(hb.hb_buffer_get_glyph_infos, HB.glyph_info_t, "I")
+        return \
+            view[2::nr_fields]
+    #end get_clusters
+
+    def get_x_advances(self) :
+        "returns a strided memoryview of the unscaled x_advance of every glyph."
+        view, nr_fields = self._get_glyph_array(hb.hb_buffer_get_glyph_positions, HB.glyph_position_t, "i")
+        return \
+            view[0::nr_fields]
+    #end get_x_advances
+
+    def get_glyph_positions_numpy(self) :
+        "returns the glyph positions as a NumPy array of shape (nr_glyphs, nr_fields)" \
+        " sharing the buffer’s memory. Needs NumPy to be installed."
+        import numpy
+        view, nr_fields = self._get_glyph_array(hb.hb_buffer_get_glyph_positions, HB.glyph_position_t, "i")
+        return \
+            numpy.frombuffer(view, dtype = numpy.intc).reshape((-1, nr_fields))
+    #end get_glyph_positions_numpy
+
     if qahirah != None :
 
         def get_glyphs(self, origin = None) :
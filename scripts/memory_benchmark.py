@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# Copyright (C) 2017-present Robert Griesel
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>
+
+
+''' Prints the memory used by the document tree per character. Usage:
+    scripts/memory_benchmark.py [number of characters] '''
+
+import sys, os.path, tracemalloc
+
+sys.dont_write_bytecode = True
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from lemma.document.ast.ast import AST
+from lemma.document.ast.node import Node
+from lemma.document.ast.style import Style
+
+
+def build_note(size):
+    ast = AST()
+    text = 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. '
+    styles = [Style.get(), Style.get({'bold'}), Style.get({'italic'}), Style.get({'bold', 'italic'})]
+
+    nodes = []
+    for i in range(size):
+        if i % 400 == 399:
+            node = Node('EOL', '\n')
+        else:
+            node = Node('char', text[i % len(text)])
+            node.style = styles[(i // 40) % len(styles)]
+        nodes.append(node)
+    ast.insert_nodes_before(ast.root[0], nodes)
+    return ast
+
+
+size = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+tracemalloc.start()
+before = tracemalloc.take_snapshot()
+ast = build_note(size)
+after = tracemalloc.take_snapshot()
+tracemalloc.stop()
+
+total = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+print('characters: {}'.format(size))
+print('bytes total: {}'.format(total))
+print('bytes per character: {:.1f}'.format(total / size))
+
+